@@ -1,8 +1,13 @@
+from typing import Any
+
 from fastapi import APIRouter
+from fastapi_cache import FastAPICache
 
 from app.auth.google_auth import google_auth_router
 from app.auth.views import auth_router
+from app.cache import TwoTierBackend
 from app.category.views import router as categories_router
+from app.database.core import async_engine, pool_stats, replica_engine
 from app.product.views import router as products_router
 
 api_router = APIRouter()
@@ -14,5 +19,13 @@ api_router.include_router(products_router, prefix="/products", tags=["products"]
 
 
 @api_router.get("/healthcheck", include_in_schema=False)
-def healthcheck() -> dict[str, str]:
-    return {"status": "ok"}
+def healthcheck() -> dict[str, Any]:
+    health: dict[str, Any] = {"status": "ok", "database": pool_stats(async_engine)}
+    if replica_engine:
+        health["database_replica"] = pool_stats(replica_engine)
+
+    backend = FastAPICache.get_backend()
+    if isinstance(backend, TwoTierBackend):
+        health["cache"] = backend.stats()
+
+    return health
@@ -1,20 +1,50 @@
-from typing import Annotated
+import json
+import logging
+from typing import Annotated, Any
 
-from fastapi import Depends
+from fastapi import Depends, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import EmailStr
+from redis.exceptions import RedisError
+from sqlalchemy import exists
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.cache import (
+    CACHE_PREFIX,
+    USER_SCOPE_PREFIX,
+    LRUCache,
+    bump_generation,
+    get_generations,
+    redis,
+)
 from app.config import settings
 from app.database.core import SessionDep
-from app.exceptions import CredentialsException
+from app.exceptions import ConstraintViolationException, CredentialsException
 from app.jwt.models import TokenData
 from app.security import get_password_hash
 
 from .models import User, UserCreate, UserCreateGoogle
 
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_PREFIX = f"{CACHE_PREFIX}:principal"
+
+INTEGRITY_ERRORS = {
+    "uq_users_email": (
+        status.HTTP_400_BAD_REQUEST,
+        "User with email `{email}` already exists.",
+    ),
+}
+
+# Users without their password hash, keyed by id and cache generation.
+_principals: LRUCache[dict[str, Any]] = LRUCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+)
+
 
 async def get(*, db_session: AsyncSession, user_id: int) -> User | None:
     """Returns a user based on the given id."""
@@ -32,16 +62,40 @@ async def get_by_email(*, db_session: AsyncSession, email: EmailStr) -> User | N
     return result.scalars().first()
 
 
+async def email_exists(*, db_session: AsyncSession, email: EmailStr) -> bool:
+    """Returns whether a user with the given email exists."""
+    query = select(exists().where(User.email == email))
+
+    return bool(await db_session.scalar(query))
+
+
 async def create(*, db_session: AsyncSession, user_in: UserCreate) -> User:
     """Creates a new user."""
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await get_password_hash(user_in.password)
     user_in.password = hashed_password
 
     user = User(**user_in.model_dump())
 
     db_session.add(user)
+    try:
+        await db_session.commit()
+    except IntegrityError as exc:
+        await db_session.rollback()
+        raise ConstraintViolationException(
+            exc, INTEGRITY_ERRORS, user_in.model_dump()
+        ) from exc
+
+    return user
+
+
+async def update_password(
+    *, db_session: AsyncSession, user: User, hashed_password: str
+) -> User:
+    """Replaces the stored password hash of a user."""
+    user.password = hashed_password
+
     await db_session.commit()
-    await db_session.refresh(user)
+    await bump_generation(f"{USER_SCOPE_PREFIX}{user.id}")
 
     return user
 
@@ -62,6 +116,58 @@ async def create_user_through_google(
     return user
 
 
+def token_claims(user: User) -> dict[str, Any]:
+    """Returns the claims identifying a user in an access token."""
+    return {"user_id": user.id, "email": user.email, "google_id": user.google_id}
+
+
+async def _load_principal(db_session: AsyncSession, user_id: int) -> User | None:
+    """
+    Returns a user for authentication, served from the principal cache.
+
+    Entries are keyed by the user's cache generation, which is bumped
+    whenever the user changes. The returned user is detached from the
+    session and has no password hash.
+    """
+    try:
+        (generation,) = await get_generations(f"{USER_SCOPE_PREFIX}{user_id}")
+    except RedisError:
+        logger.warning("Could not read the principal generation", exc_info=True)
+        return await get(db_session=db_session, user_id=user_id)
+
+    key = f"{user_id}:{generation}"
+    data = _principals.get(key)
+
+    if data is None and settings.PRINCIPAL_CACHE_REDIS:
+        try:
+            cached = await redis.get(f"{PRINCIPAL_PREFIX}:{key}")
+        except RedisError:
+            logger.warning("Could not read the principal cache", exc_info=True)
+            cached = None
+        if cached is not None:
+            data = json.loads(cached)
+            _principals.set(key, data)
+
+    if data is None:
+        user = await get(db_session=db_session, user_id=user_id)
+        if user is None:
+            return None
+
+        data = {"id": user.id, "email": user.email, "google_id": user.google_id}
+        _principals.set(key, data)
+        if settings.PRINCIPAL_CACHE_REDIS:
+            try:
+                await redis.set(
+                    f"{PRINCIPAL_PREFIX}:{key}",
+                    json.dumps(data),
+                    ex=settings.PRINCIPAL_CACHE_TTL,
+                )
+            except RedisError:
+                logger.warning("Could not write the principal cache", exc_info=True)
+
+    return User(**data)
+
+
 async def verify_access_token(
     token: str, credentials_exception: CredentialsException
 ) -> TokenData:
@@ -73,7 +179,9 @@ async def verify_access_token(
         user_id = payload.get("user_id")
         if user_id is None:
             raise credentials_exception
-        token_data = TokenData(id=user_id)
+        token_data = TokenData(
+            id=user_id, email=payload.get("email"), google_id=payload.get("google_id")
+        )
     except JWTError:
         raise credentials_exception
     return token_data
@@ -85,11 +193,21 @@ oauth2_scheme_v1 = OAuth2PasswordBearer(tokenUrl="api/v1/auth/signin")
 async def get_current_user(
     db: SessionDep, token: Annotated[str, Depends(oauth2_scheme_v1)]
 ) -> User:
-    """Retrieves the current user based on the provided JWT access token."""
+    """
+    Retrieves the current user based on the provided JWT access token.
+
+    With `AUTH_TRUST_TOKEN_CLAIMS`, the user is rebuilt from the signed
+    claims without any lookup, so a deleted or changed user stays valid
+    until the token expires. Otherwise it comes from the principal cache.
+    """
     token_data = await verify_access_token(token, CredentialsException())
 
-    result = await db.execute(select(User).where(User.id == token_data.id))
-    user = result.scalars().first()
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and token_data.email is not None:
+        return User(
+            id=token_data.id, email=token_data.email, google_id=token_data.google_id
+        )
+
+    user = await _load_principal(db, token_data.id)  # type: ignore
 
     if user is None:
         raise CredentialsException()
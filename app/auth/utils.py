@@ -1,40 +1,179 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
 import httpx
-from fastapi import HTTPException, status
 from pydantic import EmailStr
+from redis.exceptions import RedisError
 
+from app.cache import CACHE_PREFIX, redis
 from app.config import settings
+from app.exceptions import EmailVerificationUnavailableException
 
+logger = logging.getLogger(__name__)
 
-async def verify_email_with_hunter(email: EmailStr) -> bool:
-    async with httpx.AsyncClient() as client:
-        """
-        Sending a request to the hunter.io service to verify the email
-        entered by the user. All results except 'undeliverable' will return True,
-        which will indicate that the email is available for registration.
-
-        The verification result indicates the status of the email address:
-        - 'deliverable': email address is valid.
-        - 'undeliverable': the email address is not valid.
-        - 'risky': the verification can't be validated.
-
-        For more details, refer to the Hunter.io documentation:
-        https://hunter.io/api-documentation#email-verifier
-        """
-        params = {"email": email, "api_key": settings.HUNTER_IO_API_KEY}
-        response = await client.get(
-            "https://api.hunter.io/v2/email-verifier", params=params
-        )
+HUNTER_URL = "https://api.hunter.io/v2/email-verifier"
+HUNTER_PREFIX = f"{CACHE_PREFIX}:hunter"
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to verify email with Hunter.io",
-            )
+# How long each verification result is trusted for.
+RESULT_TTLS = {
+    "deliverable": settings.HUNTER_CACHE_TTL_DELIVERABLE,
+    "risky": settings.HUNTER_CACHE_TTL_RISKY,
+    "undeliverable": settings.HUNTER_CACHE_TTL_UNDELIVERABLE,
+}
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency for a while.
 
-        data = response.json()
-        result = data.get("data", {}).get("result")
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are refused for `reset_timeout` seconds. A single call is then
+    let through as a trial: success closes the circuit again, failure
+    keeps it open for another period.
+    """
 
-        if result == "undeliverable":
+    def __init__(self, *, failure_threshold: int, reset_timeout: int) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < self.reset_timeout:
             return False
 
+        # Let this call through; the others wait for another period.
+        self.opened_at = time.monotonic()
+
         return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+hunter_breaker = CircuitBreaker(
+    failure_threshold=settings.HUNTER_FAILURE_THRESHOLD,
+    reset_timeout=settings.HUNTER_RESET_TIMEOUT,
+)
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+async def _get_cached(email: str, domain: str) -> str | None:
+    """Returns a cached verification result for the address or its domain."""
+    try:
+        bad_domain, result = await redis.mget(
+            [f"{HUNTER_PREFIX}:domain:{domain}", f"{HUNTER_PREFIX}:email:{email}"]
+        )
+    except RedisError:
+        logger.warning("Could not read cached email verification", exc_info=True)
+        return None
+
+    if bad_domain is not None:
+        return "undeliverable"
+
+    return result.decode() if result is not None else None
+
+
+async def _set_cached(email: str, domain: str, data: dict[str, Any]) -> None:
+    result = data.get("result")
+    if result not in RESULT_TTLS:
+        return
+
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.set(f"{HUNTER_PREFIX}:email:{email}", result, ex=RESULT_TTLS[result])
+            # No address at a domain without MX records can receive mail.
+            if result == "undeliverable" and data.get("mx_records") is False:
+                pipe.set(
+                    f"{HUNTER_PREFIX}:domain:{domain}",
+                    1,
+                    ex=settings.HUNTER_CACHE_TTL_BAD_DOMAIN,
+                )
+            await pipe.execute()
+    except RedisError:
+        logger.warning("Could not cache email verification", exc_info=True)
+
+
+async def _ask_hunter(email: str, client: httpx.AsyncClient) -> dict[str, Any] | None:
+    """Returns Hunter's verification data, or None if no valid answer came in time."""
+    if not hunter_breaker.allow():
+        return None
+
+    params = {"email": email, "api_key": settings.HUNTER_IO_API_KEY}
+    try:
+        response = await asyncio.wait_for(
+            client.get(HUNTER_URL, params=params), settings.HUNTER_LATENCY_BUDGET
+        )
+        response.raise_for_status()
+        data = response.json()["data"]
+        if not isinstance(data, dict):
+            raise ValueError("Unexpected response")
+    except (
+        httpx.HTTPError,
+        asyncio.TimeoutError,
+        ValueError,
+        KeyError,
+        TypeError,
+    ) as exc:
+        # Not logged with the traceback: the request URL carries the API key.
+        logger.warning(
+            "Email verification with Hunter.io failed: %s", type(exc).__name__
+        )
+        hunter_breaker.record_failure()
+        return None
+
+    hunter_breaker.record_success()
+
+    return data
+
+
+async def verify_email_with_hunter(email: EmailStr, client: httpx.AsyncClient) -> bool:
+    """
+    Sending a request to the hunter.io service to verify the email
+    entered by the user. All results except 'undeliverable' will return True,
+    which will indicate that the email is available for registration.
+
+    The verification result indicates the status of the email address:
+    - 'deliverable': email address is valid.
+    - 'undeliverable': the email address is not valid.
+    - 'risky': the verification can't be validated.
+
+    Results are cached in Redis. When Hunter.io is slow or failing, the
+    email is accepted or a 503 is raised, depending on `HUNTER_FAIL_OPEN`.
+
+    For more details, refer to the Hunter.io documentation:
+    https://hunter.io/api-documentation#email-verifier
+    """
+    email = normalize_email(email)
+    domain = email.rpartition("@")[2]
+
+    result = await _get_cached(email, domain)
+    if result is None:
+        data = await _ask_hunter(email, client)
+        if data is None:
+            if settings.HUNTER_FAIL_OPEN:
+                return True
+            raise EmailVerificationUnavailableException(
+                retry_after=settings.HUNTER_RESET_TIMEOUT
+            )
+
+        await _set_cached(email, domain, data)
+        result = data.get("result")
+
+    if result == "undeliverable":
+        return False
+
+    return True
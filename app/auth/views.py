@@ -4,11 +4,19 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 
 from app.database.core import SessionDep
+from app.http_client import HTTPClientDep
 from app.jwt.models import TokenResponse
-from app.security import create_access_token, verify_password
+from app.security import create_access_token, verify_and_update_password
 
 from .models import UserCreate, UserRead
-from .service import create, get_by_email
+from .service import (
+    CurrentUser,
+    create,
+    email_exists,
+    get_by_email,
+    token_claims,
+    update_password,
+)
 from .utils import verify_email_with_hunter
 
 auth_router = APIRouter()
@@ -17,16 +25,19 @@ auth_router = APIRouter()
 @auth_router.post(
     "/signup", response_model=UserRead, status_code=status.HTTP_201_CREATED
 )
-async def signup(db_session: SessionDep, user_in: UserCreate) -> Any:
+async def signup(
+    db_session: SessionDep, http_client: HTTPClientDep, user_in: UserCreate
+) -> Any:
     """Creates a new user account."""
-    user = await get_by_email(db_session=db_session, email=user_in.email)
-    if user:
+    # The unique constraint still decides races; this only spares a duplicate
+    # signup the Hunter.io call and the password hash.
+    if await email_exists(db_session=db_session, email=user_in.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"User with email `{user_in.email}` already exists.",
         )
 
-    if not await verify_email_with_hunter(email=user_in.email):
+    if not await verify_email_with_hunter(email=user_in.email, client=http_client):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The email address provided is not valid.",
@@ -46,14 +57,29 @@ async def signin(
     """Authenticates a user and provides an access token."""
     user = await get_by_email(db_session=db_session, email=user_credentials.username)
 
-    if user and verify_password(user_credentials.password, user.password):
-        data = {"user_id": user.id}
-        access_token = create_access_token(data=data)
+    if user and user.password:
+        verified, new_hash = await verify_and_update_password(
+            user_credentials.password, user.password
+        )
+        if verified:
+            if new_hash:
+                # The cost factor changed since this hash was made.
+                await update_password(
+                    db_session=db_session, user=user, hashed_password=new_hash
+                )
+
+            access_token = create_access_token(data=token_claims(user))
 
-        return TokenResponse(access_token=access_token, token_type="bearer")
+            return TokenResponse(access_token=access_token, token_type="bearer")
 
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Incorrect email or password.",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+@auth_router.get("/me", response_model=UserRead)
+async def read_current_user(current_user: CurrentUser) -> Any:
+    """Returns the authenticated user."""
+    return current_user
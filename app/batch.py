@@ -0,0 +1,285 @@
+from collections import Counter
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+from enum import Enum
+from typing import Any, Generic, Literal, TypeVar
+
+from fastapi import status
+from sqlalchemy import Integer, column, delete, insert, select, update, values
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.core import Base
+from app.exceptions import ConstraintViolationException
+from app.models import MarketBase
+
+CreateT = TypeVar("CreateT", bound=MarketBase)
+UpdateT = TypeVar("UpdateT", bound=MarketBase)
+
+
+class BatchMode(str, Enum):
+    atomic = "atomic"
+    best_effort = "best_effort"
+
+
+class BatchCreate(MarketBase, Generic[CreateT]):
+    op: Literal["create"]
+    data: CreateT
+
+
+class BatchUpdate(MarketBase, Generic[UpdateT]):
+    op: Literal["update"]
+    id: int
+    data: UpdateT
+
+
+class BatchDelete(MarketBase):
+    op: Literal["delete"]
+    id: int
+
+
+class BatchItemResult(MarketBase):
+    index: int
+    status: int
+    id: int | None = None
+    detail: str | None = None
+
+
+class BatchResponse(MarketBase):
+    applied: bool
+    results: list[BatchItemResult]
+
+
+Operation = BatchCreate[Any] | BatchUpdate[Any] | BatchDelete
+Item = tuple[int, Any]
+Results = dict[int, BatchItemResult]
+
+
+def _payload(operation: Operation) -> dict[str, Any]:
+    """Returns the values an operation writes, used to format error details."""
+    if isinstance(operation, BatchCreate):
+        return operation.data.model_dump()
+    if isinstance(operation, BatchUpdate):
+        return {"id": operation.id, **operation.data.model_dump(exclude_unset=True)}
+
+    return {"id": operation.id}
+
+
+class _Executor:
+    """Applies one kind of operation for a list of batch items."""
+
+    def __init__(
+        self,
+        *,
+        db_session: AsyncSession,
+        model: type[Base],
+        name: str,
+        integrity_errors: Mapping[str, tuple[int, str]],
+    ) -> None:
+        self.db_session = db_session
+        self.model = model
+        self.name = name
+        self.integrity_errors = integrity_errors
+
+    def not_found(self, index: int, object_id: int) -> BatchItemResult:
+        return BatchItemResult(
+            index=index,
+            status=status.HTTP_404_NOT_FOUND,
+            id=object_id,
+            detail=f"{self.name} with id `{object_id}` does not exist.",
+        )
+
+    def duplicate(self, index: int, object_id: int) -> BatchItemResult:
+        return BatchItemResult(
+            index=index,
+            status=status.HTTP_409_CONFLICT,
+            id=object_id,
+            detail=f"{self.name} with id `{object_id}` is updated more than once.",
+        )
+
+    def failed(self, item: Item, exc: IntegrityError) -> BatchItemResult:
+        index, operation = item
+        error = ConstraintViolationException(
+            exc, self.integrity_errors, _payload(operation)
+        )
+
+        return BatchItemResult(
+            index=index,
+            status=error.status_code,
+            id=getattr(operation, "id", None),
+            detail=error.detail,
+        )
+
+    async def create(self, items: list[Item]) -> Results:
+        result = await self.db_session.execute(
+            insert(self.model).returning(
+                self.model.id, sort_by_parameter_order=True  # type: ignore
+            ),
+            [operation.data.model_dump() for _, operation in items],
+        )
+
+        return {
+            index: BatchItemResult(
+                index=index, status=status.HTTP_201_CREATED, id=object_id
+            )
+            for (index, _), object_id in zip(items, result.scalars())
+        }
+
+    async def update(self, items: list[Item]) -> Results:
+        fields = sorted(items[0][1].data.model_dump(exclude_unset=True))
+        ids = [operation.id for _, operation in items]
+
+        if fields:
+            table = self.model.__table__
+            rows = values(
+                column("id", Integer),
+                *(column(field, table.c[field].type) for field in fields),
+                name="batch",
+            ).data(
+                [
+                    (
+                        operation.id,
+                        *(getattr(operation.data, field) for field in fields),
+                    )
+                    for _, operation in items
+                ]
+            )
+            query = (
+                update(self.model)
+                .where(self.model.id == rows.c.id)  # type: ignore
+                .values({field: rows.c[field] for field in fields})
+                .returning(self.model.id)  # type: ignore
+            )
+        else:
+            query = select(self.model.id).where(  # type: ignore
+                self.model.id.in_(ids)  # type: ignore
+            )
+
+        found = set((await self.db_session.execute(query)).scalars())
+
+        return {
+            index: (
+                BatchItemResult(index=index, status=status.HTTP_200_OK, id=operation.id)
+                if operation.id in found
+                else self.not_found(index, operation.id)
+            )
+            for index, operation in items
+        }
+
+    async def delete(self, items: list[Item]) -> Results:
+        ids = [operation.id for _, operation in items]
+        result = await self.db_session.execute(
+            delete(self.model)
+            .where(self.model.id.in_(ids))  # type: ignore
+            .returning(self.model.id)  # type: ignore
+        )
+        found = set(result.scalars())
+
+        return {
+            index: (
+                BatchItemResult(
+                    index=index, status=status.HTTP_204_NO_CONTENT, id=operation.id
+                )
+                if operation.id in found
+                else self.not_found(index, operation.id)
+            )
+            for index, operation in items
+        }
+
+    async def apply(
+        self, run: Callable[[list[Item]], Awaitable[Results]], items: list[Item]
+    ) -> Results:
+        """
+        Runs a group of items as one statement inside a savepoint.
+
+        When the statement violates a constraint, the group is replayed
+        one item per savepoint so that only the offending items fail.
+        """
+        if not items:
+            return {}
+
+        try:
+            async with self.db_session.begin_nested():
+                return await run(items)
+        except IntegrityError as exc:
+            if len(items) == 1:
+                return {items[0][0]: self.failed(items[0], exc)}
+
+        results: Results = {}
+        for item in items:
+            try:
+                async with self.db_session.begin_nested():
+                    results.update(await run([item]))
+            except IntegrityError as exc:
+                results[item[0]] = self.failed(item, exc)
+
+        return results
+
+
+async def execute_batch(
+    *,
+    db_session: AsyncSession,
+    model: type[Base],
+    name: str,
+    operations: Sequence[Operation],
+    mode: BatchMode,
+    integrity_errors: Mapping[str, tuple[int, str]],
+) -> BatchResponse:
+    """
+    Applies a list of create, update and delete operations in one transaction.
+
+    Operations are grouped by kind and run as multi-row statements,
+    deletes first, then updates (one statement per set of updated
+    fields), then creates. Updates to an id that is updated more than
+    once in the batch fail with 409, as their order would be arbitrary.
+    In atomic mode, any failed item rolls back the whole batch; in
+    best-effort mode the other items are committed.
+    """
+    executor = _Executor(
+        db_session=db_session,
+        model=model,
+        name=name,
+        integrity_errors=integrity_errors,
+    )
+
+    updated_ids = Counter(
+        operation.id for operation in operations if isinstance(operation, BatchUpdate)
+    )
+
+    results: Results = {}
+    creates: list[Item] = []
+    deletes: list[Item] = []
+    updates: dict[tuple[str, ...], list[Item]] = {}
+    for index, operation in enumerate(operations):
+        if isinstance(operation, BatchCreate):
+            creates.append((index, operation))
+        elif isinstance(operation, BatchUpdate):
+            if updated_ids[operation.id] > 1:
+                results[index] = executor.duplicate(index, operation.id)
+                continue
+            fields = tuple(sorted(operation.data.model_dump(exclude_unset=True)))
+            updates.setdefault(fields, []).append((index, operation))
+        else:
+            deletes.append((index, operation))
+
+    results.update(await executor.apply(executor.delete, deletes))
+    for group in updates.values():
+        results.update(await executor.apply(executor.update, group))
+    results.update(await executor.apply(executor.create, creates))
+
+    ordered = [results[index] for index in range(len(operations))]
+    failed = any(result.status >= status.HTTP_400_BAD_REQUEST for result in ordered)
+
+    if failed and mode is BatchMode.atomic:
+        await db_session.rollback()
+        for result in ordered:
+            if result.status == status.HTTP_201_CREATED:
+                result.id = None
+            if result.status < status.HTTP_400_BAD_REQUEST:
+                result.status = status.HTTP_424_FAILED_DEPENDENCY
+                result.detail = "Not applied, another operation in the batch failed."
+
+        return BatchResponse(applied=False, results=ordered)
+
+    await db_session.commit()
+
+    return BatchResponse(applied=True, results=ordered)
@@ -0,0 +1,342 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass
+from typing import Any, Generic, TypeVar
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.types import Backend, KeyBuilder
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "fastapi-cache"
+GENERATION_PREFIX = f"{CACHE_PREFIX}:generation"
+INVALIDATION_CHANNEL = f"{CACHE_PREFIX}:invalidate"
+
+# Identifies this worker so that it can skip its own invalidation messages.
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+redis = aioredis.from_url(str(settings.REDIS_URL))
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class LRUCache(Generic[V]):
+    """A bounded in-process cache evicting the least recently used entry."""
+
+    def __init__(self, *, max_entries: int, ttl: int) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[float, V]] = OrderedDict()
+
+    def get_with_ttl(self, key: str) -> tuple[int, V | None]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.stats.misses += 1
+            return 0, None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+
+        return int(entry[0] - time.monotonic()), entry[1]
+
+    def get(self, key: str) -> V | None:
+        return self.get_with_ttl(key)[1]
+
+    def peek(self, key: str) -> V | None:
+        """Returns a live entry without touching its recency or the stats."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+
+        return entry[1]
+
+    def set(self, key: str, value: V, ttl: int | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self, prefix: str = "") -> int:
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+
+        return len(keys)
+
+
+# Generations are read on every cached request; keeping them in process
+# means a warm hit needs no Redis round-trip at all. Bumps are pushed to
+# every worker over pub/sub, and the short TTL bounds how long a worker
+# can miss one while its subscription is being re-established.
+_generations: LRUCache[int] = LRUCache(
+    max_entries=settings.CACHE_L1_MAX_ENTRIES, ttl=settings.CACHE_GENERATION_TTL
+)
+
+# Per-user scopes, e.g. `user:42`, number as many as the active users; they
+# are kept apart so that they cannot evict the hot catalog scopes.
+USER_SCOPE_PREFIX = "user:"
+_user_generations: LRUCache[int] = LRUCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl=settings.CACHE_GENERATION_TTL,
+)
+
+# When a generation was last bumped by this or, through pub/sub, any worker.
+_last_bump = 0.0
+
+
+class TwoTierBackend(Backend):
+    """
+    A `fastapi_cache` backend with a per-worker memory tier in front of Redis.
+
+    Values are written to both tiers and read from memory first. Keys
+    are versioned by generation, so memory entries never need to be
+    updated in place; explicit `clear` calls are broadcast to the other
+    workers through Redis pub/sub.
+    """
+
+    def __init__(self, redis: "aioredis.Redis[bytes]") -> None:
+        self.local: LRUCache[bytes] = LRUCache(
+            max_entries=settings.CACHE_L1_MAX_ENTRIES, ttl=settings.CACHE_L1_TTL
+        )
+        self.remote = RedisBackend(redis)
+        self.remote_stats = CacheStats()
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        ttl, value = self.local.get_with_ttl(key)
+        if value is not None:
+            return ttl, value
+
+        ttl, value = await self.remote.get_with_ttl(key)
+        if value is None:
+            self.remote_stats.misses += 1
+            return 0, None
+
+        self.remote_stats.hits += 1
+        # A negative TTL means the Redis key does not expire.
+        self.local.set(key, value, ttl if ttl > 0 else None)
+
+        return ttl, value
+
+    async def get(self, key: str) -> bytes | None:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: int | None = None) -> None:
+        self.local.set(key, value, expire)
+        await self.remote.set(key, value, expire)
+
+    async def clear(self, namespace: str | None = None, key: str | None = None) -> int:
+        if namespace:
+            self.local.clear(f"{namespace}:")
+        elif key:
+            self.local.delete(key)
+
+        await _publish({"clear": {"namespace": namespace, "key": key}})
+
+        return await self.remote.clear(namespace=namespace, key=key)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            "memory": asdict(self.local.stats),
+            "redis": asdict(self.remote_stats),
+            "generations": asdict(_generations.stats),
+            "user_generations": asdict(_user_generations.stats),
+        }
+
+
+def _generation_cache(scope: str) -> LRUCache[int]:
+    return _user_generations if scope.startswith(USER_SCOPE_PREFIX) else _generations
+
+
+def _forget_generations() -> None:
+    _generations.clear()
+    _user_generations.clear()
+
+
+def _record_bump(scopes: Iterable[str]) -> None:
+    # Per-user scopes only guard cached principals, not replica reads.
+    global _last_bump
+    if any(not scope.startswith(USER_SCOPE_PREFIX) for scope in scopes):
+        _last_bump = time.monotonic()
+
+
+def seconds_since_bump() -> float:
+    """Returns how long ago the last known write invalidated the cache."""
+    return time.monotonic() - _last_bump
+
+
+def _observe_generation(scope: str, generation: int) -> None:
+    """Records a generation, never moving a scope back to an older one."""
+    generations = _generation_cache(scope)
+    current = generations.peek(scope)
+    if current is None or generation > current:
+        generations.set(scope, generation)
+
+
+async def _publish(message: dict[str, Any]) -> None:
+    """Broadcasts an invalidation message to the other workers."""
+    try:
+        await redis.publish(
+            INVALIDATION_CHANNEL, json.dumps({"origin": WORKER_ID, **message})
+        )
+    except RedisError:
+        logger.warning("Could not publish cache invalidation", exc_info=True)
+
+
+def _apply_invalidation(message: dict[str, Any]) -> None:
+    """Applies an invalidation message received from another worker."""
+    _record_bump(message.get("generations", {}))
+    for scope, generation in message.get("generations", {}).items():
+        _observe_generation(scope, generation)
+
+    clear = message.get("clear")
+    if clear:
+        backend = FastAPICache.get_backend()
+        if isinstance(backend, TwoTierBackend):
+            if clear["namespace"]:
+                backend.local.clear(f"{clear['namespace']}:")
+            elif clear["key"]:
+                backend.local.delete(clear["key"])
+
+
+async def listen_for_invalidations() -> None:
+    """
+    Keeps this worker's memory tier in sync with writes made elsewhere.
+
+    Runs for the lifetime of the application. Whenever the subscription
+    is (re)established, locally cached generations are dropped, since
+    messages published while it was down have been lost.
+    """
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                _forget_generations()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        payload = json.loads(message["data"])
+                        if payload.get("origin") != WORKER_ID:
+                            _apply_invalidation(payload)
+                    except (ValueError, TypeError, AttributeError, KeyError):
+                        logger.warning(
+                            "Ignoring malformed cache invalidation message %r",
+                            message["data"],
+                            exc_info=True,
+                        )
+                        # Whatever it invalidated, re-read generations from Redis.
+                        _forget_generations()
+        except (RedisError, OSError):
+            logger.warning("Cache invalidation listener disconnected", exc_info=True)
+            await asyncio.sleep(1)
+
+
+async def get_generations(*scopes: str) -> list[int]:
+    """Returns the current generation of each cache scope."""
+    generations = {scope: _generation_cache(scope).get(scope) for scope in scopes}
+    missing = [scope for scope, generation in generations.items() if generation is None]
+
+    if missing:
+        values = await redis.mget([f"{GENERATION_PREFIX}:{scope}" for scope in missing])
+        for scope, value in zip(missing, values):
+            generations[scope] = int(value or 0)
+            _observe_generation(scope, int(value or 0))
+
+    return [generations[scope] for scope in scopes]  # type: ignore
+
+
+async def bump_generation(*scopes: str) -> None:
+    """
+    Invalidates every cache entry built from the given scopes.
+
+    Entries are never deleted: their keys embed the generation they were
+    built with, so once it moves on they are simply no longer looked up
+    and expire on their own. Must be called after the write is committed.
+    """
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for scope in scopes:
+                pipe.incr(f"{GENERATION_PREFIX}:{scope}")
+            values = await pipe.execute()
+    except RedisError:
+        logger.warning("Could not bump cache generation of %s", scopes, exc_info=True)
+        return
+
+    _record_bump(scopes)
+    generations = dict(zip(scopes, values))
+    for scope, generation in generations.items():
+        _observe_generation(scope, generation)
+
+    await _publish({"generations": generations})
+
+
+def versioned_key_builder(*scopes: str) -> KeyBuilder:
+    """
+    Builds cache keys that embed the current generation of each scope.
+
+    Scopes may reference the endpoint's arguments, e.g. `category:{category_id}`.
+    The key also covers the request path and its normalized query string,
+    so the same filters given in a different order share one entry.
+    """
+
+    async def key_builder(
+        func: Callable[..., Any],
+        namespace: str = "",
+        *,
+        request: Request | None = None,
+        response: Response | None = None,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> str:
+        resolved = [scope.format_map(kwargs) for scope in scopes]
+        try:
+            generations = await get_generations(*resolved)
+        except RedisError:
+            logger.warning("Could not read cache generations", exc_info=True)
+            # A key nobody else builds: the response is computed, not reused.
+            return f"{namespace}:uncached:{uuid.uuid4().hex}"
+
+        version = ",".join(
+            f"{scope}={generation}" for scope, generation in zip(resolved, generations)
+        )
+        query = ""
+        if request is not None:
+            params = sorted(set(request.query_params.multi_items()))
+            query = f"{request.url.path}?{params}"
+        digest = hashlib.md5(  # noqa: S324
+            f"{func.__module__}:{func.__name__}:{query}".encode()
+        ).hexdigest()
+
+        return f"{namespace}:{version}:{digest}"
+
+    return key_builder
@@ -1,8 +1,11 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Annotated
 
-from sqlalchemy import Text
+from pydantic import Field
+from sqlalchemy import Index, Text, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.batch import BatchCreate, BatchDelete, BatchMode, BatchUpdate
+from app.config import settings
 from app.database.core import Base
 from app.models import MarketBase
 
@@ -16,7 +19,19 @@ class Category(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(unique=True, nullable=False)
     description: Mapped[str] = mapped_column(Text, unique=False, nullable=True)
-    products: Mapped[list["Product"]] = relationship(back_populates="category")
+    products: Mapped[list["Product"]] = relationship(
+        back_populates="category", lazy="raise_on_sql"
+    )
+
+    __table_args__ = (
+        # "C" collation orders by code point, so a name prefix is a range.
+        Index("ix_categories_name_prefix", func.lower(text("name")).collate("C")),
+    )
+
+
+class CategorySuggestion(MarketBase):
+    id: int
+    name: str
 
 
 class CategoryBase(MarketBase):
@@ -35,3 +50,13 @@ class CategoryRead(CategoryBase):
 class CategoryUpdate(CategoryBase):
     name: str | None  # type: ignore
     description: str | None
+
+
+class CategoryBatchRequest(MarketBase):
+    mode: BatchMode = BatchMode.atomic
+    operations: list[
+        Annotated[
+            BatchCreate[CategoryCreate] | BatchUpdate[CategoryUpdate] | BatchDelete,
+            Field(discriminator="op"),
+        ]
+    ] = Field(min_length=1, max_length=settings.BATCH_MAX_OPERATIONS)
@@ -1,7 +1,34 @@
+from typing import Any
+
+from fastapi import status
+from sqlalchemy import delete as sql_delete
+from sqlalchemy import func, insert
+from sqlalchemy import update as sql_update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from .models import Category, CategoryCreate, CategoryUpdate
+from app.batch import BatchMode, BatchResponse, Operation, execute_batch
+from app.cache import bump_generation
+from app.database.core import prefix_match
+from app.exceptions import ConstraintViolationException
+
+from .models import Category, CategoryCreate, CategoryRead, CategoryUpdate
+
+INTEGRITY_ERRORS = {
+    "uq_categories_name": (
+        status.HTTP_400_BAD_REQUEST,
+        "Category with name `{name}` already exists.",
+    ),
+    "fk_products_category_id_categories": (
+        status.HTTP_400_BAD_REQUEST,
+        "Category with id `{id}` still has products.",
+    ),
+}
+
+# Returned by writes so that the result maps straight onto `CategoryRead`.
+READ_COLUMNS = (Category.id, Category.name, Category.description)
 
 
 async def get(*, db_session: AsyncSession, category_id: int) -> Category | None:
@@ -24,45 +51,123 @@ async def get_by_name(
     return result.scalars().first()
 
 
-async def get_all(*, db_session: AsyncSession) -> list[Category]:
+async def get_all(*, db_session: AsyncSession) -> list[Row[Any]]:
     """Return all categories."""
-    result = await db_session.execute(select(Category))
+    result = await db_session.execute(select(*READ_COLUMNS))
+
+    return result.all()  # type: ignore
+
+
+async def suggest(
+    *, db_session: AsyncSession, prefix: str, limit: int
+) -> list[Row[tuple[int, str]]]:
+    """Returns the categories whose name starts with `prefix`, ignoring case."""
+    name = func.lower(Category.name).collate("C")
+    result = await db_session.execute(
+        select(Category.id, Category.name)
+        .where(prefix_match(name, prefix.lower()))
+        .order_by(name)
+        .limit(limit)
+    )
 
-    return result.scalars().all()  # type: ignore
+    return result.all()  # type: ignore
 
 
-async def create(*, db_session: AsyncSession, category_in: CategoryCreate) -> Category:
+async def create(
+    *, db_session: AsyncSession, category_in: CategoryCreate
+) -> CategoryRead:
     """Creates a new category."""
-    category = Category(**category_in.model_dump())
+    values = category_in.model_dump()
+    try:
+        result = await db_session.execute(
+            insert(Category).values(**values).returning(*READ_COLUMNS)
+        )
+    except IntegrityError as exc:
+        await db_session.rollback()
+        raise ConstraintViolationException(exc, INTEGRITY_ERRORS, values) from exc
+    category = CategoryRead.model_validate(result.one())
 
-    db_session.add(category)
     await db_session.commit()
-    await db_session.refresh(category)
+    await bump_generation("categories")
 
     return category
 
 
 async def update(
-    *, db_session: AsyncSession, category: Category, category_in: CategoryUpdate
-) -> Category:
-    """Updates a category."""
-    category_data = category.dict()
+    *, db_session: AsyncSession, category_id: int, category_in: CategoryUpdate
+) -> CategoryRead | None:
+    """Updates a category, returning None if it does not exist."""
     update_data = category_in.model_dump(exclude_unset=True)
-    for field in category_data:
-        if field in update_data:
-            setattr(category, field, update_data[field])
+    if not update_data:
+        result = await db_session.execute(
+            select(*READ_COLUMNS).where(Category.id == category_id)
+        )
+        row = result.one_or_none()
+
+        return CategoryRead.model_validate(row) if row else None
+
+    try:
+        result = await db_session.execute(
+            sql_update(Category)
+            .where(Category.id == category_id)
+            .values(**update_data)
+            .returning(*READ_COLUMNS)
+        )
+    except IntegrityError as exc:
+        await db_session.rollback()
+        raise ConstraintViolationException(
+            exc, INTEGRITY_ERRORS, {"id": category_id, **update_data}
+        ) from exc
+    row = result.one_or_none()
+    if row is None:
+        return None
+
+    category = CategoryRead.model_validate(row)
 
     await db_session.commit()
-    await db_session.refresh(category)
+    await bump_generation("categories", f"category:{category_id}")
 
     return category
 
 
-async def delete(*, db_session: AsyncSession, category_id: int) -> None:
-    """Deletes an existing category."""
-    result = await db_session.execute(
-        select(Category).where(Category.id == category_id)
-    )
-    category = result.scalars().first()
-    await db_session.delete(category)
+async def delete(*, db_session: AsyncSession, category_id: int) -> bool:
+    """Deletes a category, returning whether it existed."""
+    try:
+        result = await db_session.execute(
+            sql_delete(Category)
+            .where(Category.id == category_id)
+            .returning(Category.id)
+        )
+    except IntegrityError as exc:
+        await db_session.rollback()
+        raise ConstraintViolationException(
+            exc, INTEGRITY_ERRORS, {"id": category_id}
+        ) from exc
+    if result.scalar_one_or_none() is None:
+        return False
+
     await db_session.commit()
+    await bump_generation("categories", f"category:{category_id}")
+
+    return True
+
+
+async def batch(
+    *, db_session: AsyncSession, operations: list[Operation], mode: BatchMode
+) -> BatchResponse:
+    """Applies a batch of category create, update and delete operations."""
+    response = await execute_batch(
+        db_session=db_session,
+        model=Category,
+        name="Category",
+        operations=operations,
+        mode=mode,
+        integrity_errors=INTEGRITY_ERRORS,
+    )
+    if response.applied:
+        await bump_generation(
+            "categories",
+            *(f"category:{result.id}" for result in response.results if result.id),
+        )
+
+    return response
@@ -1,26 +1,61 @@
 from typing import Any
 
-from fastapi import APIRouter, HTTPException, status
-from fastapi_cache.decorator import cache
+from fastapi import APIRouter, HTTPException, Query, status
 
-from app.database.core import SessionDep
+from app.batch import BatchResponse
+from app.cache import versioned_key_builder
+from app.config import settings
+from app.database.core import ReadSessionDep, SessionDep
+from app.response_cache import CachedRoute, cache_response
+from app.serialization import json_response
 
-from .models import CategoryCreate, CategoryRead, CategoryUpdate
-from .service import create, delete, get, get_all, get_by_name, update
+from .models import (
+    CategoryBatchRequest,
+    CategoryCreate,
+    CategoryRead,
+    CategorySuggestion,
+    CategoryUpdate,
+)
+from .service import batch, create, delete, get, get_all, suggest, update
 
-router = APIRouter()
+router = APIRouter(route_class=CachedRoute)
 
 
 @router.get("/", response_model=list[CategoryRead])
-@cache(expire=3600)
-async def get_categories(db_session: SessionDep) -> Any:
+@cache_response(
+    expire=settings.CACHE_EXPIRE,
+    key_builder=versioned_key_builder("categories"),
+)
+async def get_categories(db_session: ReadSessionDep) -> Any:
     """Return all categories in the database."""
-    return await get_all(db_session=db_session)
+    return json_response(await get_all(db_session=db_session))
+
+
+@router.get("/suggest", response_model=list[CategorySuggestion])
+@cache_response(
+    expire=settings.CACHE_EXPIRE,
+    key_builder=versioned_key_builder("categories"),
+)
+async def suggest_categories(
+    db_session: ReadSessionDep,
+    prefix: str = Query(..., min_length=1, max_length=100, description="Name prefix"),
+    limit: int = Query(
+        settings.SUGGEST_DEFAULT_LIMIT,
+        ge=1,
+        le=settings.SUGGEST_MAX_LIMIT,
+        description="Number of suggestions",
+    ),
+) -> Any:
+    """Suggest categories whose name starts with the given prefix."""
+    return await suggest(db_session=db_session, prefix=prefix, limit=limit)
 
 
 @router.get("/{category_id}", response_model=CategoryRead)
-@cache(expire=3600)
-async def get_category(db_session: SessionDep, category_id: int) -> Any:
+@cache_response(
+    expire=settings.CACHE_EXPIRE,
+    key_builder=versioned_key_builder("category:{category_id}"),
+)
+async def get_category(db_session: ReadSessionDep, category_id: int) -> Any:
     """Retrieve information about a category by its ID."""
     category = await get(db_session=db_session, category_id=category_id)
     if not category:
@@ -38,13 +73,6 @@ async def create_category(
     category_in: CategoryCreate,
 ) -> Any:
     """Create a new category."""
-    category = await get_by_name(db_session=db_session, category_name=category_in.name)
-    if category:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Category with name `{category_in.name}` already exists.",
-        )
-
     category = await create(db_session=db_session, category_in=category_in)
 
     return category
@@ -57,15 +85,14 @@ async def update_category(
     category_in: CategoryUpdate,
 ) -> Any:
     """Update a category."""
-    category = await get(db_session=db_session, category_id=category_id)
+    category = await update(
+        db_session=db_session, category_id=category_id, category_in=category_in
+    )
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Category with id `{category_id}` does not exist.",
         )
-    category = await update(
-        db_session=db_session, category=category, category_in=category_in
-    )
 
     return category
 
@@ -73,10 +100,18 @@ async def update_category(
 @router.delete("/{category_id}", response_model=None)
 async def delete_category(db_session: SessionDep, category_id: int) -> None:
     """Delete a category."""
-    category = await get(db_session=db_session, category_id=category_id)
-    if not category:
+    if not await delete(db_session=db_session, category_id=category_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Category with id `{category_id}` does not exist.",
         )
-    await delete(db_session=db_session, category_id=category_id)
+
+
+@router.post(":batch", response_model=BatchResponse)
+async def batch_categories(
+    db_session: SessionDep, batch_in: CategoryBatchRequest
+) -> Any:
+    """Apply a list of create, update and delete operations in one transaction."""
+    return await batch(
+        db_session=db_session, operations=batch_in.operations, mode=batch_in.mode
+    )
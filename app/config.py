@@ -13,6 +13,7 @@ class Settings(BaseSettings):
     VERSION: str = "0.0.1"
     TIMEZONE: str = "UTC"
     DESCRIPTION: str = "Welcome to Market API documentation!"
+    DEBUG: bool = False
 
     DOCS_URL: str = "/docs"
     OPENAPI_URL: str = "/openapi.json"
@@ -24,20 +25,91 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     DATABASE_URL: PostgresDsn
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30.0
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100
+    # Connect through pgbouncer in transaction pooling mode.
+    DATABASE_PGBOUNCER: bool = False
+    DATABASE_REPLICA_URL: PostgresDsn | None = None
+    # How far the replica may trail the primary, in seconds.
+    DATABASE_REPLICA_MAX_LAG: int = 5
+    DATABASE_REPLICA_RETRY_AFTER: int = 30
+    DATABASE_PROFILE_ENABLED: bool = True
+    # Log requests repeating a statement more often, or spending longer (s).
+    DATABASE_PROFILE_MAX_REPEATS: int = 5
+    DATABASE_PROFILE_TIME_BUDGET: float = 0.25
 
     TEST_DB_NAME: str
 
     REDIS_URL: RedisDsn
+    CACHE_EXPIRE: int = 86400
+    CACHE_L1_MAX_ENTRIES: int = 1024
+    CACHE_L1_TTL: int = 60
+    CACHE_GENERATION_TTL: int = 10
+    RESPONSE_CACHE_GZIP_MIN_SIZE: int = 500
+    RESPONSE_CACHE_GZIP_LEVEL: int = 6
+    # How long clients may reuse a cached response without revalidating it.
+    RESPONSE_CACHE_CLIENT_MAX_AGE: int = 0
+
+    METRICS_ENABLED: bool = True
+    # Scrapers send it as a bearer token; unset leaves /metrics unexposed.
+    METRICS_TOKEN: str | None = None
+
+    # Requests sending this token in `X-Profiler-Token` are profiled, and
+    # the profiles can only be read with it. Unset disables both.
+    PROFILER_TOKEN: str | None = None
+    PROFILER_SAMPLE_RATE: float = 0.0
+    PROFILER_INTERVAL: float = 0.005
+    PROFILER_MAX_PROFILES: int = 50
 
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
+    PRINCIPAL_CACHE_TTL: int = 300
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    PRINCIPAL_CACHE_REDIS: bool = False
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
+
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
     GOOGLE_REDIRECT_URI: str
 
     HUNTER_IO_API_KEY: str
+    HUNTER_CACHE_TTL_DELIVERABLE: int = 2592000
+    HUNTER_CACHE_TTL_RISKY: int = 86400
+    HUNTER_CACHE_TTL_UNDELIVERABLE: int = 604800
+    HUNTER_CACHE_TTL_BAD_DOMAIN: int = 604800
+    HUNTER_LATENCY_BUDGET: float = 2.0
+    HUNTER_FAILURE_THRESHOLD: int = 5
+    HUNTER_RESET_TIMEOUT: int = 30
+    HUNTER_FAIL_OPEN: bool = True
+
+    HTTP_CLIENT_HTTP2: bool = True
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CLIENT_MAX_PER_HOST: int = 20
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 3.0
+    HTTP_CLIENT_READ_TIMEOUT: float = 10.0
+
+    PAGINATION_DEFAULT_LIMIT: int = 50
+    PAGINATION_MAX_LIMIT: int = 500
+    SUGGEST_DEFAULT_LIMIT: int = 10
+    SUGGEST_MAX_LIMIT: int = 50
+    FACET_PRICE_BUCKETS: int = 10
+    FACET_MAX_PRICE_BUCKETS: int = 100
+
+    EXPORT_FETCH_SIZE: int = 1000
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000
+    BATCH_MAX_OPERATIONS: int = 1000
 
     IS_ALLOWED_CREDENTIALS: bool = True
     ALLOWED_ORIGINS: list[str] = [
@@ -1,12 +1,33 @@
+import logging
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
 from typing import Annotated, Any, AsyncGenerator
 
-from fastapi import Depends
-from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from fastapi import Depends, Request, Response
+from sqlalchemy import ColumnElement, MetaData, and_, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
+from app.cache import seconds_since_bump
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+# Set on responses to writes; keeps the client's reads on the primary.
+PRIMARY_COOKIE = "read_primary"
+
 DATABASE_URL = (
     "postgresql+asyncpg://"
     f"{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@"
@@ -14,7 +35,115 @@ DATABASE_URL = (
     f"{settings.POSTGRES_DB}"
 )
 
-async_engine = create_async_engine(DATABASE_URL, echo=False)
+
+@dataclass
+class PoolWaitStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """A queue pool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.waits = PoolWaitStats()
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.waits.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.waits.checkouts += 1
+            self.waits.wait_seconds_total += elapsed
+            self.waits.wait_seconds_max = max(self.waits.wait_seconds_max, elapsed)
+
+
+def connect_args() -> dict[str, Any]:
+    if settings.DATABASE_PGBOUNCER:
+        # pgbouncer in transaction mode may hand each transaction a different
+        # server connection, so statements must not be cached per connection
+        # and prepared statement names must never be reused.
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+
+    return {
+        "statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+    }
+
+
+def create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        connect_args=connect_args(),
+    )
+
+
+def pool_stats(engine: AsyncEngine) -> dict[str, Any]:
+    """Returns the live state of an engine's connection pool."""
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedPool):
+        return {"status": pool.status()}
+
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # Negative while the pool has not yet opened `size` connections.
+        "overflow": max(pool.overflow(), 0),
+        **asdict(pool.waits),
+    }
+
+
+StatementObserver = Callable[[str, float], None]
+
+_statement_observers: dict[Engine, list[StatementObserver]] = {}
+
+
+def observe_statements(engine: AsyncEngine, observer: StatementObserver) -> None:
+    """
+    Calls `observer` with every statement run through `engine` and its duration.
+
+    The observers of an engine share one pair of cursor listeners, so each
+    statement is timed once however many of them there are.
+    """
+    observers = _statement_observers.get(engine.sync_engine)
+    if observers is None:
+        observers = _statement_observers[engine.sync_engine] = []
+
+        def before_cursor_execute(*args: Any) -> None:
+            # The execution context is the fifth argument.
+            args[4]._statement_start = time.perf_counter()
+
+        def after_cursor_execute(*args: Any) -> None:
+            elapsed = time.perf_counter() - args[4]._statement_start
+            for observe in observers:
+                observe(args[2], elapsed)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+    observers.append(observer)
+
+
+async_engine = create_engine(DATABASE_URL)
 
 async_session = async_sessionmaker(
     bind=async_engine,
@@ -24,6 +153,27 @@ async_session = async_sessionmaker(
     expire_on_commit=False,
 )
 
+replica_engine = (
+    create_engine(str(settings.DATABASE_REPLICA_URL))
+    if settings.DATABASE_REPLICA_URL
+    else None
+)
+
+replica_session = (
+    async_sessionmaker(
+        bind=replica_engine,
+        class_=AsyncSession,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    if replica_engine
+    else None
+)
+
+# Until when reads stay on the primary after the replica failed to connect.
+_replica_down_until = 0.0
+
 
 class Base(DeclarativeBase):
     """Base class for SQLAlchemy models.
@@ -46,9 +196,100 @@ class Base(DeclarativeBase):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
 
 
+def prefix_match(expression: ColumnElement[str], prefix: str) -> ColumnElement[bool]:
+    """
+    Matches the values that start with `prefix` through a range condition.
+
+    Unlike `LIKE 'prefix%'`, the range needs no escaping and can use a
+    "C" collation index even when the prefix is a statement parameter.
+    """
+    condition = expression >= prefix
+    if prefix:
+        upper = ord(prefix[-1]) + 1
+        if 0xD800 <= upper <= 0xDFFF:
+            # Surrogates cannot be encoded, skip past them.
+            upper = 0xE000
+        if upper <= 0x10FFFF:
+            condition = and_(condition, expression < prefix[:-1] + chr(upper))
+
+    return condition
+
+
+def get_constraint_name(exc: IntegrityError) -> str | None:
+    """Returns the name of the constraint that raised an integrity error."""
+    return getattr(getattr(exc.orig, "__cause__", None), "constraint_name", None)
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
 
 
+def use_primary(request: Request) -> bool:
+    """
+    Tells whether a read must see the latest writes.
+
+    That is the case for clients that have just written something, and
+    for everyone shortly after any write: the cached responses built
+    from the read are keyed by the new cache generation, so they must
+    not be filled with rows the replica has not received yet.
+    """
+    return (
+        PRIMARY_COOKIE in request.cookies
+        or seconds_since_bump() < settings.DATABASE_REPLICA_MAX_LAG
+    )
+
+
+@asynccontextmanager
+async def read_session(*, primary: bool = False) -> AsyncIterator[AsyncSession]:
+    """
+    Opens a session for read-only work.
+
+    It is bound to the replica when one is configured and reachable, and
+    to the primary otherwise or when `primary` is set.
+    """
+    global _replica_down_until
+
+    if not primary and replica_session and time.monotonic() >= _replica_down_until:
+        async with replica_session() as session:
+            try:
+                await session.connection()
+            except (DBAPIError, OSError, PoolTimeoutError):
+                logger.warning(
+                    "Replica unavailable, reading from primary", exc_info=True
+                )
+                _replica_down_until = (
+                    time.monotonic() + settings.DATABASE_REPLICA_RETRY_AFTER
+                )
+            else:
+                yield session
+                return
+
+    async with async_session() as session:
+        yield session
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with read_session(primary=use_primary(request)) as session:
+        yield session
+
+
+async def read_your_writes(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Sends the reads of a client that just wrote to the primary for a while."""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        response.set_cookie(
+            PRIMARY_COOKIE,
+            "1",
+            max_age=settings.DATABASE_REPLICA_MAX_LAG,
+            httponly=True,
+            samesite="lax",
+        )
+
+    return response
+
+
 SessionDep = Annotated[AsyncSession, Depends(get_db)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_db)]
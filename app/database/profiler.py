@@ -0,0 +1,156 @@
+import logging
+import re
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.database.core import observe_statements
+
+logger = logging.getLogger(__name__)
+
+# Runs of bound parameters, e.g. the members of an IN list.
+_PARAMETERS = re.compile(r"\$\d+(?:\s*,\s*\$\d+)*")
+
+
+def statement_shape(statement: str) -> str:
+    """Folds a statement into a shape shared by its variants, e.g. IN lists."""
+    return " ".join(_PARAMETERS.sub("?", statement).split())
+
+
+@dataclass
+class QueryProfile:
+    """The statements run on behalf of one request or block of code."""
+
+    label: str = ""
+    queries: int = 0
+    duration: float = 0.0
+    statements: Counter[str] = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.duration += elapsed
+        self.statements[statement] += 1
+
+    def repeated(self, max_repeats: int) -> dict[str, int]:
+        """Returns the statement shapes run more than `max_repeats` times."""
+        shapes: Counter[str] = Counter()
+        for statement, count in self.statements.items():
+            shapes[statement_shape(statement)] += count
+
+        return {shape: count for shape, count in shapes.items() if count > max_repeats}
+
+    def summary(self) -> str:
+        return (
+            f"{self.label}: {self.queries} statements in "
+            f"{self.duration * 1000:.1f} ms"
+        )
+
+
+_current: ContextVar[QueryProfile | None] = ContextVar("query_profile", default=None)
+
+# Profiles that record every statement, whichever task or thread runs it.
+_observers: list[QueryProfile] = []
+
+
+def _record(statement: str, elapsed: float) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+    for observer in _observers:
+        observer.record(statement, elapsed)
+
+
+def profile_engine(engine: AsyncEngine) -> None:
+    """Attributes every statement run through `engine` to the current profile."""
+    observe_statements(engine, _record)
+
+
+@contextmanager
+def profile_queries(label: str = "") -> Iterator[QueryProfile]:
+    """Collects the statements run by the current task inside the block."""
+    profile = QueryProfile(label=label)
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryProfile]:
+    """
+    Fails when the block runs more than `limit` statements.
+
+    Meant for tests: every statement counts, including those run by an
+    application served in another thread, such as through `TestClient`.
+
+        with assert_max_queries(1):
+            client.get("/api/v1/products/1")
+    """
+    profile = QueryProfile(label=f"at most {limit} statements")
+    _observers.append(profile)
+    try:
+        yield profile
+    finally:
+        _observers.remove(profile)
+
+    if profile.queries > limit:
+        statements = "\n".join(
+            f"{count}x {statement_shape(statement)}"
+            for statement, count in profile.statements.items()
+        )
+        raise AssertionError(
+            f"Expected {profile.label}, got {profile.queries}:\n{statements}"
+        )
+
+
+class QueryProfilerMiddleware:
+    """
+    Profiles the statements run while handling each HTTP request.
+
+    A warning is logged when a statement shape is repeated more than
+    `DATABASE_PROFILE_MAX_REPEATS` times, the usual sign of an N+1 query,
+    or when the statements take longer than `DATABASE_PROFILE_TIME_BUDGET`.
+    In debug mode the counts are also returned as `X-DB-Queries` and
+    `X-DB-Time` (milliseconds) response headers. Headers are sent before
+    the body, so for streamed responses, such as the product export, they
+    only cover the statements run before streaming began; the warnings
+    cover the whole request.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(profile.queries)
+                headers["X-DB-Time"] = f"{profile.duration * 1000:.2f}"
+            await send(message)
+
+        with profile_queries(f"{scope['method']} {scope['path']}") as profile:
+            await self.app(
+                scope, receive, send_with_headers if settings.DEBUG else send
+            )
+
+        repeated = profile.repeated(settings.DATABASE_PROFILE_MAX_REPEATS)
+        if repeated:
+            logger.warning(
+                "%s; repeated statements:\n%s",
+                profile.summary(),
+                "\n".join(f"{count}x {shape}" for shape, count in repeated.items()),
+            )
+        elif profile.duration > settings.DATABASE_PROFILE_TIME_BUDGET:
+            logger.warning("%s, over the time budget", profile.summary())
@@ -1,4 +1,10 @@
+from collections.abc import Mapping
+from typing import Any
+
 from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+
+from app.database.core import get_constraint_name
 
 
 class CredentialsException(HTTPException):
@@ -12,3 +18,96 @@ class CredentialsException(HTTPException):
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+class InvalidCursorException(HTTPException):
+    """
+    Exception raised when a pagination cursor could not be decoded.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor.",
+        )
+
+
+class InvalidCatalogFileException(HTTPException):
+    """
+    Exception raised when an imported catalog file cannot be read at all.
+    """
+
+    def __init__(self, detail: str) -> None:
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class ServiceUnavailableException(HTTPException):
+    """
+    Exception raised when the server is too busy to handle a request.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The server is busy, please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+
+
+class EmailVerificationUnavailableException(HTTPException):
+    """
+    Exception raised when an email address could not be verified in time.
+    """
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Email verification is temporarily unavailable.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class ConstraintViolationException(HTTPException):
+    """
+    Exception raised when a write violates a database constraint.
+
+    The constraint name selects the status code and detail template from
+    `errors`, the template is then formatted with the written `values`.
+    """
+
+    def __init__(
+        self,
+        exc: IntegrityError,
+        errors: Mapping[str, tuple[int, str]],
+        values: Mapping[str, Any],
+    ) -> None:
+        status_code, detail = errors.get(
+            get_constraint_name(exc) or "",
+            (status.HTTP_400_BAD_REQUEST, "Operation violates a database constraint."),
+        )
+        super().__init__(status_code=status_code, detail=detail.format_map(values))
+
+
+class InvalidMetricsTokenException(HTTPException):
+    """
+    Exception raised when the metrics are scraped without their token.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+class InvalidProfilerTokenException(HTTPException):
+    """
+    Exception raised when the profiler endpoints are called without their token.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid profiler token.",
+        )
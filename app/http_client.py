@@ -0,0 +1,133 @@
+import asyncio
+import importlib.util
+import time
+from collections.abc import AsyncIterator
+from typing import Annotated
+
+import httpx
+from fastapi import Depends, Request
+
+from app.config import settings
+from app.metrics import http_client_request_duration
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body stream that frees its host slot once closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: asyncio.Semaphore):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release.release()
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Caps the number of concurrent requests to each host.
+
+    httpx only limits connections for the whole pool, so one slow
+    upstream could otherwise take every connection. A slot is held
+    until the response body is closed.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._slots: dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        slots = self._slots.setdefault(
+            request.url.host, asyncio.Semaphore(self._max_per_host)
+        )
+        await slots.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            slots.release()
+            raise
+
+        if isinstance(response.stream, httpx.ByteStream):
+            # The body is already in memory and holds no connection.
+            slots.release()
+        else:
+            response.stream = _ReleasingStream(response.stream, slots)  # type: ignore
+
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Records how long each host takes to answer, until the response headers."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await self._transport.handle_async_request(request)
+            outcome = f"{response.status_code // 100}xx"
+            return response
+        finally:
+            http_client_request_duration.observe(
+                time.perf_counter() - start, request.url.host, outcome
+            )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def create_http_client(
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    """
+    Creates the application-wide client for outbound HTTP calls.
+
+    A `transport` can be given to replace the network, e.g. with an
+    `httpx.MockTransport` in tests.
+    """
+    if transport is None:
+        # HTTP/2 needs the optional `h2` package (`httpx[http2]`).
+        http2 = (
+            settings.HTTP_CLIENT_HTTP2 and importlib.util.find_spec("h2") is not None
+        )
+        transport = HostLimitedTransport(
+            httpx.AsyncHTTPTransport(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+                ),
+            ),
+            max_per_host=settings.HTTP_CLIENT_MAX_PER_HOST,
+        )
+
+    return httpx.AsyncClient(
+        transport=InstrumentedTransport(transport),
+        timeout=httpx.Timeout(
+            settings.HTTP_CLIENT_READ_TIMEOUT,
+            connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+        ),
+    )
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.http_client
+
+
+HTTPClientDep = Annotated[httpx.AsyncClient, Depends(get_http_client)]
@@ -3,6 +3,8 @@ from app.models import MarketBase
 
 class TokenData(MarketBase):
     id: int | None = None
+    email: str | None = None
+    google_id: str | None = None
 
 
 class TokenResponse(MarketBase):
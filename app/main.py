@@ -1,23 +1,37 @@
+import asyncio
+import contextlib
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
-from redis import asyncio as aioredis
+from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.cors import CORSMiddleware
 
 from .api import api_router
+from .cache import CACHE_PREFIX, TwoTierBackend, listen_for_invalidations, redis
 from .config import settings
+from .database.core import async_engine, read_your_writes, replica_engine
+from .database.profiler import QueryProfilerMiddleware, profile_engine
+from .http_client import create_http_client
+from .metrics import MetricsMiddleware, instrument_engine, metrics_router
+from .profiling import ProfilerMiddleware, profiles_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     # Startup
-    redis = aioredis.from_url(str(settings.REDIS_URL))
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    FastAPICache.init(TwoTierBackend(redis), prefix=CACHE_PREFIX)
+    invalidations = asyncio.create_task(listen_for_invalidations())
+    app.state.http_client = create_http_client()
     yield
     # Shutdown
+    await app.state.http_client.aclose()
+    invalidations.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await invalidations
+    await redis.close()
 
 
 # Initialize a FastAPI application with custom settings
@@ -27,9 +41,15 @@ app = FastAPI(
     docs_url=settings.DOCS_URL,
     openapi_url=settings.OPENAPI_URL,
     redoc_url=settings.REDOC_URL,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan,
 )
 
+# Added first so that it is the innermost middleware: the endpoint runs
+# in the task it profiles, without the other middleware in the stacks.
+app.add_middleware(ProfilerMiddleware)
+app.include_router(profiles_router, include_in_schema=False)
+
 # Add CORS middleware to the FastAPI application
 # This middleware allows configuring how the server
 # should respond to cross-origin requests.
@@ -41,5 +61,22 @@ app.add_middleware(
     allow_headers=settings.ALLOWED_HEADERS,
 )
 
+if settings.DATABASE_REPLICA_URL:
+    app.add_middleware(BaseHTTPMiddleware, dispatch=read_your_writes)
+
+if settings.DATABASE_PROFILE_ENABLED:
+    profile_engine(async_engine)
+    if replica_engine:
+        profile_engine(replica_engine)
+    app.add_middleware(QueryProfilerMiddleware)
+
+if settings.METRICS_ENABLED:
+    instrument_engine(async_engine, "primary")
+    if replica_engine:
+        instrument_engine(replica_engine, "replica")
+    # Added last so that it is the outermost middleware and times them all.
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
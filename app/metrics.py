@@ -0,0 +1,321 @@
+import secrets
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator
+from typing import Annotated, TypeVar
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi_cache import FastAPICache
+from sqlalchemy import event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.responses import PlainTextResponse
+from starlette.status import HTTP_404_NOT_FOUND
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache import TwoTierBackend
+from app.config import settings
+from app.database.core import (
+    async_engine,
+    observe_statements,
+    pool_stats,
+    replica_engine,
+)
+from app.exceptions import InvalidMetricsTokenException
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+CACHE_EVENTS = {"hits": "hit", "misses": "miss", "evictions": "eviction"}
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+    return f"{{{pairs}}}" if pairs else ""
+
+
+class Metric:
+    """
+    A family of samples sharing a name, one per combination of label values.
+
+    Label values are passed positionally, in the order of `labels`, and
+    must be drawn from a small fixed set: every combination lives for the
+    lifetime of the process.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: LabelValues = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: LabelValues = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, labels)} {value}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: LabelValues = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+        # Per label values: the count of each bucket, then +Inf, and the sum.
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1][0] += value
+
+    def samples(self) -> Iterator[str]:
+        bounds = [*(repr(bound) for bound in self.buckets), "+Inf"]
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                bucket_labels = _format_labels((*self.labels, "le"), (*labels, bound))
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            label_text = _format_labels(self.labels, labels)
+            yield f"{self.name}_sum{label_text} {total[0]}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[Metric] = []
+        self._collectors: list[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def collector(
+        self, func: Callable[[], Iterable[Metric]]
+    ) -> Callable[[], Iterable[Metric]]:
+        """Registers a function building metrics from state read at scrape time."""
+        self._collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        metrics = [*self._metrics]
+        for collect in self._collectors:
+            metrics.extend(collect())
+
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests handled, by route and status code.",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time spent handling HTTP requests, by route.",
+        ("method", "route"),
+    )
+)
+http_requests_in_progress = registry.register(
+    Gauge(
+        "http_requests_in_progress",
+        "HTTP requests currently being handled.",
+        ("method",),
+    )
+)
+db_query_duration = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Time spent executing database statements.",
+        ("engine",),
+        DB_BUCKETS,
+    )
+)
+db_query_errors = registry.register(
+    Counter("db_query_errors_total", "Database statements that failed.", ("engine",))
+)
+response_cache_requests = registry.register(
+    Counter(
+        "response_cache_requests_total",
+        "Cached endpoint requests answered from the cache (HIT) or not (MISS).",
+        ("result",),
+    )
+)
+http_client_request_duration = registry.register(
+    Histogram(
+        "http_client_request_duration_seconds",
+        "Time until outbound HTTP requests received their response headers.",
+        ("host", "outcome"),
+    )
+)
+
+
+@registry.collector
+def _collect_pools() -> Iterable[Metric]:
+    connections = Gauge(
+        "db_pool_connections", "Connections in the pool.", ("engine", "state")
+    )
+    waits = Counter(
+        "db_pool_wait_seconds_total",
+        "Time spent waiting for a connection.",
+        ("engine",),
+    )
+    timeouts = Counter(
+        "db_pool_timeouts_total", "Checkouts that timed out.", ("engine",)
+    )
+    engines = {"primary": async_engine, "replica": replica_engine}
+    for name, engine in engines.items():
+        if engine is None:
+            continue
+        stats = pool_stats(engine)
+        if "size" not in stats:
+            continue
+        for state in ("checked_in", "checked_out", "overflow"):
+            connections.set(name, state, value=stats[state])
+        waits.inc(name, amount=stats["wait_seconds_total"])
+        timeouts.inc(name, amount=stats["timeouts"])
+
+    return connections, waits, timeouts
+
+
+@registry.collector
+def _collect_cache() -> Iterable[Metric]:
+    events = Counter(
+        "cache_events_total",
+        "Cache backend hits, misses and evictions, by tier.",
+        ("tier", "event"),
+    )
+    backend = FastAPICache.get_backend()
+    if isinstance(backend, TwoTierBackend):
+        for tier, stats in backend.stats().items():
+            for name, value in stats.items():
+                events.inc(tier, CACHE_EVENTS[name], amount=value)
+
+    return (events,)
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """Records the duration of every statement run through `engine`."""
+
+    def observe(statement: str, elapsed: float) -> None:
+        db_query_duration.observe(elapsed, name)
+
+    def handle_error(context: ExceptionContext) -> None:
+        db_query_errors.inc(name)
+
+    observe_statements(engine, observe)
+    event.listen(engine.sync_engine, "handle_error", handle_error)
+
+
+class MetricsMiddleware:
+    """
+    Counts and times every HTTP request.
+
+    Requests are labelled with the path template of the route that handled
+    them, e.g. `/api/v1/products/{product_id}`, so that the number of
+    series stays bounded; requests matching no route share `unmatched`.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_progress.dec(method)
+            # The router stores the matched route in the shared scope.
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_requests.inc(method, path, str(status))
+            http_request_duration.observe(elapsed, method, path)
+
+
+def verify_metrics_token(authorization: Annotated[str | None, Header()] = None) -> None:
+    if settings.METRICS_TOKEN is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND)
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token, settings.METRICS_TOKEN
+    ):
+        raise InvalidMetricsTokenException()
+
+
+metrics_router = APIRouter(dependencies=[Depends(verify_metrics_token)])
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Expose the collected metrics in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,51 @@
+import base64
+import json
+from collections.abc import Callable, Sequence
+from typing import Any, Generic, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from app.exceptions import InvalidCursorException
+from app.models import MarketBase
+
+T = TypeVar("T")
+CursorT = TypeVar("CursorT", bound=BaseModel)
+
+
+class Page(MarketBase, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+
+
+def encode_cursor(cursor: BaseModel) -> str:
+    """Encodes a cursor model into an opaque url-safe string."""
+    raw = json.dumps(cursor.model_dump(mode="json"), separators=(",", ":"))
+
+    return base64.urlsafe_b64encode(raw.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, model: type[CursorT]) -> CursorT:
+    """Decodes an opaque cursor string produced by `encode_cursor`."""
+    padding = "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        return model.model_validate(values)
+    except (ValueError, ValidationError):
+        raise InvalidCursorException()
+
+
+def paginate(
+    items: Sequence[T], *, limit: int, cursor_for: Callable[[T], BaseModel]
+) -> dict[str, Any]:
+    """
+    Builds a page from a keyset query that fetched `limit + 1` rows.
+
+    The extra row only signals that another page exists; it is dropped
+    and the cursor is built from the last row that is returned.
+    """
+    if len(items) <= limit:
+        return {"items": items, "next_cursor": None}
+
+    items = items[:limit]
+
+    return {"items": items, "next_cursor": encode_cursor(cursor_for(items[-1]))}
@@ -0,0 +1,202 @@
+import csv
+import json
+from collections.abc import Iterable, Iterator
+from typing import Any, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import bump_generation
+from app.config import settings
+from app.exceptions import InvalidCatalogFileException
+
+from .models import CatalogFormat, ImportReport, ImportRowError, ProductCreate
+
+STAGING_TABLE = "products_import"
+STAGING_COLUMNS = ("line", "name", "description", "price", "category_id")
+
+Record = tuple[int, str, str | None, float, int]
+
+
+def _record(line: int, row: Any, errors: list[ImportRowError]) -> Record | None:
+    """Validates a parsed row, recording a row error if it is invalid."""
+    if not isinstance(row, dict):
+        errors.append(ImportRowError(line=line, error="Row must be an object."))
+        return None
+
+    row.setdefault("description", None)
+    if row["description"] == "":
+        row["description"] = None
+
+    try:
+        product = ProductCreate.model_validate(row)
+    except ValidationError as exc:
+        error = "; ".join(
+            f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors()
+        )
+        errors.append(ImportRowError(line=line, error=error))
+        return None
+
+    return (
+        line,
+        product.name,
+        product.description,
+        product.price,
+        product.category_id,
+    )
+
+
+def parse_csv(file: TextIO, errors: list[ImportRowError]) -> Iterator[Record]:
+    """Yields valid records from a CSV file with a header row."""
+    reader = csv.DictReader(file)
+    try:
+        for row in reader:
+            record = _record(reader.line_num, row, errors)
+            if record is not None:
+                yield record
+    except UnicodeDecodeError as exc:
+        raise InvalidCatalogFileException("The file is not valid UTF-8.") from exc
+    except csv.Error as exc:
+        raise InvalidCatalogFileException(
+            f"Malformed CSV at line {reader.line_num}: {exc}."
+        ) from exc
+
+
+def parse_ndjson(file: TextIO, errors: list[ImportRowError]) -> Iterator[Record]:
+    """Yields valid records from a newline-delimited JSON file."""
+    try:
+        for line, raw in enumerate(file, start=1):
+            if not raw.strip():
+                continue
+            try:
+                row = json.loads(raw)
+            except ValueError:
+                errors.append(ImportRowError(line=line, error="Invalid JSON."))
+                continue
+            record = _record(line, row, errors)
+            if record is not None:
+                yield record
+    except UnicodeDecodeError as exc:
+        raise InvalidCatalogFileException("The file is not valid UTF-8.") from exc
+
+
+PARSERS = {
+    CatalogFormat.csv: parse_csv,
+    CatalogFormat.ndjson: parse_ndjson,
+}
+
+
+async def import_products(
+    *,
+    db_session: AsyncSession,
+    records: Iterable[Record],
+    errors: list[ImportRowError],
+    update_existing: bool,
+) -> ImportReport:
+    """
+    Bulk loads products through a COPY into a temporary staging table.
+
+    Category references and name uniqueness are checked in SQL against
+    the staging table, and the valid rows are merged into `products`
+    in the same transaction. Rows that fail a check are reported with
+    their line number instead of aborting the import. With
+    `update_existing`, rows whose name already exists update that
+    product instead of being reported.
+    """
+    await db_session.execute(
+        text(
+            f"CREATE TEMP TABLE {STAGING_TABLE} ("
+            "line integer PRIMARY KEY, "
+            "name text NOT NULL, "
+            "description text, "
+            "price double precision NOT NULL, "
+            "category_id integer NOT NULL, "
+            "error text"
+            ") ON COMMIT DROP"
+        )
+    )
+
+    connection = await db_session.connection()
+    raw_connection = await connection.get_raw_connection()
+    # The asyncpg connection, set once the pooled connection is checked out.
+    driver_connection: Any = raw_connection.driver_connection
+    status = await driver_connection.copy_records_to_table(
+        STAGING_TABLE, records=records, columns=STAGING_COLUMNS
+    )
+    staged = int(status.split()[-1])
+
+    await db_session.execute(text(f"ANALYZE {STAGING_TABLE}"))
+
+    await db_session.execute(
+        text(
+            f"UPDATE {STAGING_TABLE} s "
+            "SET error = "
+            "format('Category with id `%s` does not exist.', s.category_id) "
+            "WHERE NOT EXISTS (SELECT 1 FROM categories c WHERE c.id = s.category_id)"
+        )
+    )
+    await db_session.execute(
+        text(
+            f"UPDATE {STAGING_TABLE} s "
+            "SET error = format('Duplicate product name `%s` in file.', s.name) "
+            "FROM ("
+            "SELECT line, row_number() OVER (PARTITION BY name ORDER BY line) AS n "
+            f"FROM {STAGING_TABLE} WHERE error IS NULL"
+            ") d "
+            "WHERE d.line = s.line AND d.n > 1"
+        )
+    )
+
+    insert = (
+        "INSERT INTO products (name, description, price, category_id) "
+        "SELECT name, description, price, category_id "
+        f"FROM {STAGING_TABLE} WHERE error IS NULL ORDER BY line "
+        "ON CONFLICT ON CONSTRAINT uq_products_name "
+    )
+    if update_existing:
+        await db_session.execute(
+            text(
+                insert + "DO UPDATE SET "
+                "description = EXCLUDED.description, "
+                "price = EXCLUDED.price, "
+                "category_id = EXCLUDED.category_id"
+            )
+        )
+    else:
+        # Names taken by existing rows (or by a concurrent writer) are
+        # exactly the staged rows the insert did not return.
+        await db_session.execute(
+            text(
+                f"WITH inserted AS ({insert} DO NOTHING RETURNING name) "
+                f"UPDATE {STAGING_TABLE} s "
+                "SET error = format('Product with name `%s` already exists.', s.name) "
+                "WHERE s.error IS NULL "
+                "AND NOT EXISTS (SELECT 1 FROM inserted i WHERE i.name = s.name)"
+            )
+        )
+
+    failed: int = await db_session.scalar(
+        text(f"SELECT count(*) FROM {STAGING_TABLE} WHERE error IS NOT NULL")
+    )
+    rows = await db_session.execute(
+        text(
+            f"SELECT line, error FROM {STAGING_TABLE} "
+            "WHERE error IS NOT NULL ORDER BY line LIMIT :limit"
+        ),
+        {"limit": settings.IMPORT_MAX_REPORTED_ERRORS},
+    )
+    staged_errors = [ImportRowError(line=line, error=error) for line, error in rows]
+
+    await db_session.commit()
+    await bump_generation("products")
+
+    failed += len(errors)
+    report_errors = sorted(errors + staged_errors, key=lambda error: error.line)
+
+    return ImportReport(
+        received=staged + len(errors),
+        imported=staged + len(errors) - failed,
+        failed=failed,
+        errors=report_errors[: settings.IMPORT_MAX_REPORTED_ERRORS],
+    )
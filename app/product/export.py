@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+
+from app.database.core import read_session
+
+from .models import CatalogFormat, Product
+from .service import stream_all
+
+EXPORT_FIELDS = ("id", "name", "description", "price", "category_id")
+
+MEDIA_TYPES = {
+    CatalogFormat.ndjson: "application/x-ndjson",
+    CatalogFormat.csv: "text/csv",
+}
+
+
+def encode_ndjson(products: Sequence[Product]) -> str:
+    """Encodes a batch of products as newline-delimited JSON."""
+    return "".join(
+        json.dumps({field: getattr(product, field) for field in EXPORT_FIELDS}) + "\n"
+        for product in products
+    )
+
+
+def encode_csv(products: Sequence[Product]) -> str:
+    """Encodes a batch of products as CSV rows without a header."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [getattr(product, field) for field in EXPORT_FIELDS] for product in products
+    )
+
+    return buffer.getvalue()
+
+
+async def export_products(
+    *,
+    export_format: CatalogFormat,
+    min_price: float | None,
+    max_price: float | None,
+    category_ids: list[int] | None,
+    fetch_size: int,
+    primary: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Yields the filtered catalog encoded in the requested format.
+
+    The generator owns its session: it outlives the request handler,
+    so the session provided by `ReadSessionDep` is already closed by the
+    time the response body is sent.
+    """
+    if export_format is CatalogFormat.csv:
+        encode = encode_csv
+        yield ",".join(EXPORT_FIELDS) + "\r\n"
+    else:
+        encode = encode_ndjson
+
+    async with read_session(primary=primary) as db_session:
+        async for products in stream_all(
+            db_session=db_session,
+            min_price=min_price,
+            max_price=max_price,
+            category_ids=category_ids,
+            fetch_size=fetch_size,
+        ):
+            yield encode(products)
@@ -1,10 +1,20 @@
-from sqlalchemy import ForeignKey, Text
+from enum import Enum
+from typing import Annotated
+
+from pydantic import Field
+from sqlalchemy import Computed, ForeignKey, Index, Text, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.batch import BatchCreate, BatchDelete, BatchMode, BatchUpdate
 from app.category.models import Category
+from app.config import settings
 from app.database.core import Base
 from app.models import MarketBase
 
+# Text search configuration used for the search vector and the queries.
+SEARCH_CONFIG = "english"
+
 
 class Product(Base):
     __tablename__ = "products"
@@ -14,7 +24,36 @@ class Product(Base):
     description: Mapped[str] = mapped_column(Text, unique=False, nullable=True)
     price: Mapped[float] = mapped_column(unique=False, nullable=True)
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
-    category: Mapped["Category"] = relationship(back_populates="products")
+    category: Mapped["Category"] = relationship(
+        back_populates="products", lazy="raise_on_sql"
+    )
+    # Maintained by Postgres; names weigh more than descriptions when ranking.
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') "
+            f"|| setweight(to_tsvector('{SEARCH_CONFIG}', "
+            "coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
+    __table_args__ = (
+        Index("ix_products_category_id_id", "category_id", "id"),
+        Index("ix_products_category_id_price_id", "category_id", "price", "id"),
+        Index(
+            "ix_products_price_id", "price", "id", postgresql_include=["category_id"]
+        ),
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        # "C" collation orders by code point, so a name prefix is a range.
+        Index("ix_products_name_prefix", func.lower(text("name")).collate("C")),
+    )
+
+
+class ProductSuggestion(MarketBase):
+    id: int
+    name: str
 
 
 class ProductBase(MarketBase):
@@ -38,3 +77,66 @@ class ProductUpdate(ProductBase):
     description: str | None
     price: float | None  # type: ignore
     category_id: int | None
+
+
+class ProductOrder(str, Enum):
+    id = "id"
+    price = "price"
+
+
+class ProductCursor(MarketBase):
+    order_by: ProductOrder
+    id: int
+    price: float | None = None
+
+
+class ProductSearchCursor(MarketBase):
+    rank: float
+    id: int
+
+
+class CategoryFacet(MarketBase):
+    category_id: int
+    count: int
+
+
+class PriceBucket(MarketBase):
+    lower: float
+    upper: float
+    count: int
+
+
+class ProductFacets(MarketBase):
+    total: int
+    priced: int
+    min_price: float | None
+    max_price: float | None
+    categories: list[CategoryFacet]
+    price_histogram: list[PriceBucket]
+
+
+class CatalogFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class ImportRowError(MarketBase):
+    line: int
+    error: str
+
+
+class ImportReport(MarketBase):
+    received: int
+    imported: int
+    failed: int
+    errors: list[ImportRowError]
+
+
+class ProductBatchRequest(MarketBase):
+    mode: BatchMode = BatchMode.atomic
+    operations: list[
+        Annotated[
+            BatchCreate[ProductCreate] | BatchUpdate[ProductUpdate] | BatchDelete,
+            Field(discriminator="op"),
+        ]
+    ] = Field(min_length=1, max_length=settings.BATCH_MAX_OPERATIONS)
@@ -1,7 +1,58 @@
+from collections.abc import AsyncIterator, Sequence
+from typing import Any, TypeVar
+
+from fastapi import status
+from sqlalchemy import ColumnElement, Select, and_, case
+from sqlalchemy import delete as sql_delete
+from sqlalchemy import func, insert, literal_column, or_, true, tuple_
+from sqlalchemy import update as sql_update
+from sqlalchemy.dialects.postgresql import REAL
+from sqlalchemy.dialects.postgresql.ext import websearch_to_tsquery
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from .models import Product, ProductCreate, ProductUpdate
+from app.batch import BatchMode, BatchResponse, Operation, execute_batch
+from app.cache import bump_generation
+from app.database.core import prefix_match
+from app.exceptions import ConstraintViolationException
+
+from .models import (
+    SEARCH_CONFIG,
+    CategoryFacet,
+    PriceBucket,
+    Product,
+    ProductCreate,
+    ProductCursor,
+    ProductFacets,
+    ProductOrder,
+    ProductRead,
+    ProductSearchCursor,
+    ProductUpdate,
+)
+
+SelectT = TypeVar("SelectT", bound=Select[Any])
+
+INTEGRITY_ERRORS = {
+    "uq_products_name": (
+        status.HTTP_400_BAD_REQUEST,
+        "Product with name `{name}` already exists.",
+    ),
+    "fk_products_category_id_categories": (
+        status.HTTP_404_NOT_FOUND,
+        "Category with id `{category_id}` does not exist.",
+    ),
+}
+
+# Returned by writes so that the result maps straight onto `ProductRead`.
+READ_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.description,
+    Product.price,
+    Product.category_id,
+)
 
 
 async def get(*, db_session: AsyncSession, product_id: int) -> Product | None:
@@ -20,14 +71,72 @@ async def get_by_name(*, db_session: AsyncSession, product_name: str) -> Product
     return result.scalars().first()
 
 
+def _filter(
+    query: SelectT,
+    *,
+    min_price: float | None,
+    max_price: float | None,
+    category_ids: list[int] | None,
+) -> SelectT:
+    """Applies the optional price and category filters to a product query."""
+    if min_price is not None:
+        query = query.where(Product.price >= min_price)
+    if max_price is not None:
+        query = query.where(Product.price <= max_price)
+
+    if category_ids:
+        query = query.where(Product.category_id.in_(category_ids))
+
+    return query
+
+
+def _keyset(
+    query: SelectT,
+    *,
+    order_by: ProductOrder,
+    after: ProductCursor | None,
+    limit: int,
+) -> SelectT:
+    """
+    Orders a product query and seeks past the given cursor.
+
+    One extra row is fetched so the caller can tell whether
+    another page follows without running a separate count.
+    """
+    if order_by is ProductOrder.price:
+        query = query.order_by(Product.price.asc().nulls_last(), Product.id)
+        if after is not None and after.price is None:
+            query = query.where(Product.price.is_(None), Product.id > after.id)
+        elif after is not None:
+            query = query.where(
+                or_(
+                    Product.price > after.price,
+                    and_(Product.price == after.price, Product.id > after.id),
+                    Product.price.is_(None),
+                )
+            )
+    else:
+        query = query.order_by(Product.id)
+        if after is not None:
+            query = query.where(Product.id > after.id)
+
+    return query.limit(limit + 1)
+
+
 async def get_products_by_category(
-    *, db_session: AsyncSession, category_id: int
-) -> list[Product]:
-    """Return all products from the database for a given category."""
-    query = select(Product).where(Product.category_id == category_id)
+    *,
+    db_session: AsyncSession,
+    category_id: int,
+    order_by: ProductOrder,
+    after: ProductCursor | None,
+    limit: int,
+) -> list[Row[Any]]:
+    """Return a page of products from the database for a given category."""
+    query = select(*READ_COLUMNS).where(Product.category_id == category_id)
+    query = _keyset(query, order_by=order_by, after=after, limit=limit)
     result = await db_session.execute(query)
 
-    return result.scalars().all()  # type: ignore
+    return result.all()  # type: ignore
 
 
 async def get_all(
@@ -35,54 +144,279 @@ async def get_all(
     db_session: AsyncSession,
     min_price: float | None,
     max_price: float | None,
-    category_ids: list[int] | None
-) -> list[Product] | None:
-    """Return products from the database based on optional filters."""
-    query = select(Product)
+    category_ids: list[int] | None,
+    order_by: ProductOrder,
+    after: ProductCursor | None,
+    limit: int,
+) -> list[Row[Any]]:
+    """Return a page of products from the database based on optional filters."""
+    query = _filter(
+        select(*READ_COLUMNS),
+        min_price=min_price,
+        max_price=max_price,
+        category_ids=category_ids,
+    )
+    query = _keyset(query, order_by=order_by, after=after, limit=limit)
 
-    if min_price is not None:
-        query = query.where(Product.price >= min_price)
-    if max_price is not None:
-        query = query.where(Product.price <= max_price)
+    result = await db_session.execute(query)
 
-    if category_ids:
-        query = query.where(Product.category_id.in_(category_ids))
+    return result.all()  # type: ignore
+
+
+async def get_facets(
+    *,
+    db_session: AsyncSession,
+    min_price: float | None,
+    max_price: float | None,
+    category_ids: list[int] | None,
+    buckets: int,
+) -> ProductFacets:
+    """
+    Aggregates the filtered catalog for a browsing sidebar.
+
+    One statement scans the filtered products once and groups them by
+    category, by price bucket and as a whole. The histogram splits the
+    range between the lowest and highest price into `buckets` equal
+    parts; products without a price are left out of it.
+    """
+    filtered = _filter(
+        select(Product.category_id, Product.price),
+        min_price=min_price,
+        max_price=max_price,
+        category_ids=category_ids,
+    ).cte("filtered")
+    bounds = select(
+        func.min(filtered.c.price).label("low"),
+        func.max(filtered.c.price).label("high"),
+    ).cte("bounds")
+
+    # Inlined so that the expression in GROUP BY matches the select list.
+    count: ColumnElement[int] = literal_column(str(int(buckets)))
+    bucket = case(
+        (filtered.c.price.is_(None), None),
+        (
+            bounds.c.high > bounds.c.low,
+            # The highest price falls just outside the last bucket.
+            func.least(
+                func.width_bucket(filtered.c.price, bounds.c.low, bounds.c.high, count),
+                count,
+            ),
+        ),
+        else_=literal_column("1"),
+    )
+
+    result = await db_session.execute(
+        select(
+            func.grouping(filtered.c.category_id, bucket).label("grouping"),
+            filtered.c.category_id,
+            bucket.label("bucket"),
+            func.count().label("products"),
+            func.count().filter(filtered.c.price.is_not(None)).label("priced"),
+            func.min(bounds.c.low).label("low"),
+            func.max(bounds.c.high).label("high"),
+        )
+        .select_from(filtered.join(bounds, true()))
+        .group_by(func.grouping_sets(filtered.c.category_id, bucket, tuple_()))
+    )
+
+    total = priced = 0
+    low = high = None
+    categories: list[CategoryFacet] = []
+    histogram = [0] * buckets
+    for row in result:
+        # Bits of `grouping` are set for the columns left out of the set.
+        if row.grouping == 0b01:
+            categories.append(
+                CategoryFacet(category_id=row.category_id, count=row.products)
+            )
+        elif row.grouping == 0b10 and row.bucket is not None:
+            histogram[row.bucket - 1] = row.products
+        elif row.grouping == 0b11:
+            total, priced, low, high = row.products, row.priced, row.low, row.high
+
+    price_histogram = []
+    if low is not None and high is not None:
+        width = (high - low) / buckets
+        price_histogram = [
+            PriceBucket(
+                lower=low + index * width,
+                upper=high if index == buckets - 1 else low + (index + 1) * width,
+                count=bucket_count,
+            )
+            for index, bucket_count in enumerate(histogram)
+        ]
+
+    return ProductFacets(
+        total=total,
+        priced=priced,
+        min_price=low,
+        max_price=high,
+        categories=sorted(categories, key=lambda facet: facet.category_id),
+        price_histogram=price_histogram,
+    )
+
+
+async def search(
+    *,
+    db_session: AsyncSession,
+    terms: str,
+    min_price: float | None,
+    max_price: float | None,
+    category_ids: list[int] | None,
+    after: ProductSearchCursor | None,
+    limit: int,
+) -> list[Row[tuple[Product, float]]]:
+    """
+    Returns a page of products matching a web-style search query.
+
+    Rows hold the product and its rank, best matches first. Like the
+    other listings, one extra row is fetched to detect the next page.
+    """
+    tsquery = websearch_to_tsquery(SEARCH_CONFIG, terms)
+    rank = func.ts_rank(Product.search_vector, tsquery, type_=REAL).label("rank")
+
+    query = _filter(
+        select(Product, rank).where(Product.search_vector.op("@@")(tsquery)),
+        min_price=min_price,
+        max_price=max_price,
+        category_ids=category_ids,
+    )
+    if after is not None:
+        query = query.where(
+            or_(rank < after.rank, and_(rank == after.rank, Product.id > after.id))
+        )
+    query = query.order_by(rank.desc(), Product.id).limit(limit + 1)
 
     result = await db_session.execute(query)
 
-    return result.scalars().all()  # type: ignore
+    return result.all()  # type: ignore
+
+
+async def suggest(
+    *, db_session: AsyncSession, prefix: str, limit: int
+) -> list[Row[tuple[int, str]]]:
+    """Returns the products whose name starts with `prefix`, ignoring case."""
+    name = func.lower(Product.name).collate("C")
+    result = await db_session.execute(
+        select(Product.id, Product.name)
+        .where(prefix_match(name, prefix.lower()))
+        .order_by(name)
+        .limit(limit)
+    )
+
+    return result.all()  # type: ignore
 
 
-async def create(*, db_session: AsyncSession, product_in: ProductCreate) -> Product:
+async def stream_all(
+    *,
+    db_session: AsyncSession,
+    min_price: float | None,
+    max_price: float | None,
+    category_ids: list[int] | None,
+    fetch_size: int,
+) -> AsyncIterator[Sequence[Product]]:
+    """
+    Streams filtered products through a server-side cursor.
+
+    Rows are yielded in batches of `fetch_size` so that memory use does
+    not depend on the size of the catalog.
+    """
+    query = _filter(
+        select(Product),
+        min_price=min_price,
+        max_price=max_price,
+        category_ids=category_ids,
+    ).order_by(Product.id)
+
+    result = await db_session.stream_scalars(
+        query.execution_options(yield_per=fetch_size)
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+async def create(*, db_session: AsyncSession, product_in: ProductCreate) -> ProductRead:
     """Creates a new product."""
-    product = Product(**product_in.model_dump())
+    values = product_in.model_dump()
+    try:
+        result = await db_session.execute(
+            insert(Product).values(**values).returning(*READ_COLUMNS)
+        )
+    except IntegrityError as exc:
+        await db_session.rollback()
+        raise ConstraintViolationException(exc, INTEGRITY_ERRORS, values) from exc
+    product = ProductRead.model_validate(result.one())
 
-    db_session.add(product)
     await db_session.commit()
-    await db_session.refresh(product)
+    await bump_generation("products")
 
     return product
 
 
 async def update(
-    *, db_session: AsyncSession, product: Product, product_in: ProductUpdate
-) -> Product:
-    """Updates a product."""
-    product_data = product.dict()
+    *, db_session: AsyncSession, product_id: int, product_in: ProductUpdate
+) -> ProductRead | None:
+    """Updates a product, returning None if it does not exist."""
     update_data = product_in.model_dump(exclude_unset=True)
-    for field in product_data:
-        if field in update_data:
-            setattr(product, field, update_data[field])
+    if not update_data:
+        result = await db_session.execute(
+            select(*READ_COLUMNS).where(Product.id == product_id)
+        )
+        row = result.one_or_none()
+
+        return ProductRead.model_validate(row) if row else None
+
+    try:
+        result = await db_session.execute(
+            sql_update(Product)
+            .where(Product.id == product_id)
+            .values(**update_data)
+            .returning(*READ_COLUMNS)
+        )
+    except IntegrityError as exc:
+        await db_session.rollback()
+        raise ConstraintViolationException(
+            exc, INTEGRITY_ERRORS, {"id": product_id, **update_data}
+        ) from exc
+    row = result.one_or_none()
+    if row is None:
+        return None
+
+    product = ProductRead.model_validate(row)
 
     await db_session.commit()
-    await db_session.refresh(product)
+    await bump_generation("products")
 
     return product
 
 
-async def delete(*, db_session: AsyncSession, product_id: int) -> None:
-    """Deletes an existing product."""
-    result = await db_session.execute(select(Product).where(Product.id == product_id))
-    product = result.scalars().first()
-    await db_session.delete(product)
+async def delete(*, db_session: AsyncSession, product_id: int) -> bool:
+    """Deletes a product, returning whether it existed."""
+    result = await db_session.execute(
+        sql_delete(Product).where(Product.id == product_id).returning(Product.id)
+    )
+    if result.scalar_one_or_none() is None:
+        return False
+
     await db_session.commit()
+    await bump_generation("products")
+
+    return True
+
+
+async def batch(
+    *, db_session: AsyncSession, operations: list[Operation], mode: BatchMode
+) -> BatchResponse:
+    """Applies a batch of product create, update and delete operations."""
+    response = await execute_batch(
+        db_session=db_session,
+        model=Product,
+        name="Product",
+        operations=operations,
+        mode=mode,
+        integrity_errors=INTEGRITY_ERRORS,
+    )
+    if response.applied:
+        await bump_generation("products")
+
+    return response
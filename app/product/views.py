@@ -1,37 +1,102 @@
+import io
+from collections.abc import Callable
 from typing import Any
 
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import Row
 
+from app.batch import BatchResponse
+from app.cache import versioned_key_builder
 from app.category.service import get as get_category
-from app.database.core import SessionDep
+from app.config import settings
+from app.database.core import ReadSessionDep, SessionDep, use_primary
+from app.exceptions import InvalidCursorException
+from app.pagination import Page, decode_cursor, paginate
+from app.response_cache import CachedRoute, cache_response
+from app.serialization import json_response
 
-from .models import ProductCreate, ProductRead, ProductUpdate
+from .bulk import PARSERS, import_products
+from .export import MEDIA_TYPES, export_products
+from .models import (
+    CatalogFormat,
+    ImportReport,
+    ImportRowError,
+    ProductBatchRequest,
+    ProductCreate,
+    ProductCursor,
+    ProductFacets,
+    ProductOrder,
+    ProductRead,
+    ProductSearchCursor,
+    ProductSuggestion,
+    ProductUpdate,
+)
 from .service import (
+    batch,
     create,
     delete,
     get,
     get_all,
-    get_by_name,
+    get_facets,
     get_products_by_category,
+    search,
+    suggest,
     update,
 )
 
-router = APIRouter()
+router = APIRouter(route_class=CachedRoute)
+
+
+def _cursor_for(order_by: ProductOrder) -> Callable[[Row[Any]], ProductCursor]:
+    """Returns a function building the cursor that resumes after a product."""
+
+    def cursor_for(product: Row[Any]) -> ProductCursor:
+        return ProductCursor(order_by=order_by, id=product.id, price=product.price)
+
+    return cursor_for
+
+
+def _decode_cursor(cursor: str | None, order_by: ProductOrder) -> ProductCursor | None:
+    """Decodes a client cursor, rejecting cursors issued for another ordering."""
+    if cursor is None:
+        return None
 
+    after = decode_cursor(cursor, ProductCursor)
+    if after.order_by is not order_by:
+        raise InvalidCursorException()
 
-@router.get("/", response_model=list[ProductRead])
+    return after
+
+
+@router.get("/", response_model=Page[ProductRead])
+@cache_response(
+    expire=settings.CACHE_EXPIRE,
+    key_builder=versioned_key_builder("products"),
+)
 async def get_products(
-    db_session: SessionDep,
+    db_session: ReadSessionDep,
     min_price: float | None = Query(None, description="Min price"),
     max_price: float | None = Query(None, description="Max price"),
     category_ids: list[int] | None = Query(None, description="Categories list"),
+    order_by: ProductOrder = Query(ProductOrder.id, description="Sort order"),
+    cursor: str | None = Query(None, description="Cursor from the previous page"),
+    limit: int = Query(
+        settings.PAGINATION_DEFAULT_LIMIT,
+        ge=1,
+        le=settings.PAGINATION_MAX_LIMIT,
+        description="Page size",
+    ),
 ) -> Any:
-    """Retrieve products with optional filters for price and categories."""
+    """Retrieve a page of products with optional filters for price and categories."""
     products = await get_all(
         db_session=db_session,
         min_price=min_price,
         max_price=max_price,
         category_ids=category_ids,
+        order_by=order_by,
+        after=_decode_cursor(cursor, order_by),
+        limit=limit,
     )
 
     if products == []:
@@ -39,11 +104,131 @@ async def get_products(
             status_code=status.HTTP_404_NOT_FOUND, detail="Products were not found."
         )
 
-    return products
+    return json_response(
+        paginate(products, limit=limit, cursor_for=_cursor_for(order_by))
+    )
+
+
+@router.get("/facets", response_model=ProductFacets)
+@cache_response(
+    expire=settings.CACHE_EXPIRE, key_builder=versioned_key_builder("products")
+)
+async def get_product_facets(
+    db_session: ReadSessionDep,
+    min_price: float | None = Query(None, description="Min price"),
+    max_price: float | None = Query(None, description="Max price"),
+    category_ids: list[int] | None = Query(None, description="Categories list"),
+    buckets: int = Query(
+        settings.FACET_PRICE_BUCKETS,
+        ge=1,
+        le=settings.FACET_MAX_PRICE_BUCKETS,
+        description="Number of price histogram buckets",
+    ),
+) -> Any:
+    """Retrieve product counts per category and a price histogram for the filters."""
+    return await get_facets(
+        db_session=db_session,
+        min_price=min_price,
+        max_price=max_price,
+        category_ids=category_ids,
+        buckets=buckets,
+    )
+
+
+@router.get("/search", response_model=Page[ProductRead])
+@cache_response(
+    expire=settings.CACHE_EXPIRE, key_builder=versioned_key_builder("products")
+)
+async def search_products(
+    db_session: ReadSessionDep,
+    q: str = Query(..., min_length=1, max_length=256, description="Search terms"),
+    min_price: float | None = Query(None, description="Min price"),
+    max_price: float | None = Query(None, description="Max price"),
+    category_ids: list[int] | None = Query(None, description="Categories list"),
+    cursor: str | None = Query(None, description="Cursor from the previous page"),
+    limit: int = Query(
+        settings.PAGINATION_DEFAULT_LIMIT,
+        ge=1,
+        le=settings.PAGINATION_MAX_LIMIT,
+        description="Page size",
+    ),
+) -> Any:
+    """Search product names and descriptions, best matches first."""
+    rows = await search(
+        db_session=db_session,
+        terms=q,
+        min_price=min_price,
+        max_price=max_price,
+        category_ids=category_ids,
+        after=decode_cursor(cursor, ProductSearchCursor) if cursor else None,
+        limit=limit,
+    )
+
+    page = paginate(
+        rows,
+        limit=limit,
+        cursor_for=lambda row: ProductSearchCursor(rank=row.rank, id=row.Product.id),
+    )
+    page["items"] = [row.Product for row in page["items"]]
+
+    return page
+
+
+@router.get("/suggest", response_model=list[ProductSuggestion])
+@cache_response(
+    expire=settings.CACHE_EXPIRE,
+    key_builder=versioned_key_builder("products"),
+)
+async def suggest_products(
+    db_session: ReadSessionDep,
+    prefix: str = Query(..., min_length=1, max_length=100, description="Name prefix"),
+    limit: int = Query(
+        settings.SUGGEST_DEFAULT_LIMIT,
+        ge=1,
+        le=settings.SUGGEST_MAX_LIMIT,
+        description="Number of suggestions",
+    ),
+) -> Any:
+    """Suggest products whose name starts with the given prefix."""
+    return await suggest(db_session=db_session, prefix=prefix, limit=limit)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export(
+    request: Request,
+    export_format: CatalogFormat = Query(
+        CatalogFormat.ndjson, alias="format", description="Export format"
+    ),
+    min_price: float | None = Query(None, description="Min price"),
+    max_price: float | None = Query(None, description="Max price"),
+    category_ids: list[int] | None = Query(None, description="Categories list"),
+) -> StreamingResponse:
+    """Stream the whole filtered catalog as NDJSON or CSV."""
+    rows = export_products(
+        export_format=export_format,
+        min_price=min_price,
+        max_price=max_price,
+        category_ids=category_ids,
+        fetch_size=settings.EXPORT_FETCH_SIZE,
+        primary=use_primary(request),
+    )
+
+    return StreamingResponse(
+        rows,
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": (
+                f"attachment; filename=products.{export_format.value}"
+            )
+        },
+    )
 
 
 @router.get("/{product_id}", response_model=ProductRead)
-async def get_product(db_session: SessionDep, product_id: int) -> Any:
+@cache_response(
+    expire=settings.CACHE_EXPIRE, key_builder=versioned_key_builder("products")
+)
+async def get_product(db_session: ReadSessionDep, product_id: int) -> Any:
     """Retrieve a single product by its ID."""
     product = await get(db_session=db_session, product_id=product_id)
     if not product:
@@ -57,11 +242,26 @@ async def get_product(db_session: SessionDep, product_id: int) -> Any:
 
 @router.get(
     "/category{category_id}",
-    response_model=list[ProductRead],
+    response_model=Page[ProductRead],
     status_code=status.HTTP_200_OK,
 )
-async def get_by_category(db_session: SessionDep, category_id: int) -> Any:
-    """Retrieve products by category ID."""
+@cache_response(
+    expire=settings.CACHE_EXPIRE,
+    key_builder=versioned_key_builder("products", "category:{category_id}"),
+)
+async def get_by_category(
+    db_session: ReadSessionDep,
+    category_id: int,
+    order_by: ProductOrder = Query(ProductOrder.id, description="Sort order"),
+    cursor: str | None = Query(None, description="Cursor from the previous page"),
+    limit: int = Query(
+        settings.PAGINATION_DEFAULT_LIMIT,
+        ge=1,
+        le=settings.PAGINATION_MAX_LIMIT,
+        description="Page size",
+    ),
+) -> Any:
+    """Retrieve a page of products by category ID."""
     category = await get_category(db_session=db_session, category_id=category_id)
     if not category:
         raise HTTPException(
@@ -70,7 +270,11 @@ async def get_by_category(db_session: SessionDep, category_id: int) -> Any:
         )
 
     products = await get_products_by_category(
-        db_session=db_session, category_id=category_id
+        db_session=db_session,
+        category_id=category_id,
+        order_by=order_by,
+        after=_decode_cursor(cursor, order_by),
+        limit=limit,
     )
 
     if products == []:
@@ -79,7 +283,9 @@ async def get_by_category(db_session: SessionDep, category_id: int) -> Any:
             detail=f"Products related to category ID: {category_id} not found.",
         )
 
-    return products
+    return json_response(
+        paginate(products, limit=limit, cursor_for=_cursor_for(order_by))
+    )
 
 
 @router.post("/", response_model=ProductRead, status_code=status.HTTP_201_CREATED)
@@ -88,27 +294,45 @@ async def create_product(
     product_in: ProductCreate,
 ) -> Any:
     """Create a new product."""
-    product = await get_by_name(db_session=db_session, product_name=product_in.name)
-    if product:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Product with name `{product_in.name}` already exists.",
-        )
-
-    category = await get_category(
-        db_session=db_session, category_id=product_in.category_id
-    )
-    if not category:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Category with id `{product_in.category_id}` does not exist.",
-        )
-
     product = await create(db_session=db_session, product_in=product_in)
 
     return product
 
 
+@router.post("/import", response_model=ImportReport)
+async def import_catalog(
+    db_session: SessionDep,
+    file: UploadFile,
+    import_format: CatalogFormat | None = Query(
+        None, alias="format", description="File format, guessed from the file name"
+    ),
+    update_existing: bool = Query(
+        False, description="Update products whose name already exists"
+    ),
+) -> Any:
+    """Bulk import products from a CSV or NDJSON upload."""
+    if import_format is None:
+        extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+        if extension not in CatalogFormat.__members__:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Could not guess the file format, pass `format` explicitly.",
+            )
+        import_format = CatalogFormat(extension)
+
+    errors: list[ImportRowError] = []
+    records = PARSERS[import_format](
+        io.TextIOWrapper(file.file, encoding="utf-8", newline=""), errors
+    )
+
+    return await import_products(
+        db_session=db_session,
+        records=records,
+        errors=errors,
+        update_existing=update_existing,
+    )
+
+
 @router.put("/{product_id}", response_model=ProductRead)
 async def update_product(
     db_session: SessionDep,
@@ -116,45 +340,31 @@ async def update_product(
     product_in: ProductUpdate,
 ) -> Any:
     """Update an existing product by ID."""
-    product = await get(db_session=db_session, product_id=product_id)
+    product = await update(
+        db_session=db_session, product_id=product_id, product_in=product_in
+    )
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Product with id `{product_id}` does not exist.",
         )
 
-    product_db = await get_by_name(
-        db_session=db_session, product_name=product_in.name  # type: ignore
-    )
-    if product_db:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Product with name `{product_in.name}` already exists.",
-        )
-
-    category = await get_category(
-        db_session=db_session, category_id=product_in.category_id  # type: ignore
-    )
-    if not category:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Category with id `{product_in.category_id}` does not exist.",
-        )
-
-    product = await update(
-        db_session=db_session, product=product, product_in=product_in
-    )
-
     return product
 
 
 @router.delete("/{product_id}", response_model=None)
 async def delete_product(db_session: SessionDep, product_id: int) -> None:
     """Delete a product by ID."""
-    product = await get(db_session=db_session, product_id=product_id)
-    if not product:
+    if not await delete(db_session=db_session, product_id=product_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Product with id `{product_id}` does not exist.",
         )
-    await delete(db_session=db_session, product_id=product_id)
+
+
+@router.post(":batch", response_model=BatchResponse)
+async def batch_products(db_session: SessionDep, batch_in: ProductBatchRequest) -> Any:
+    """Apply a list of create, update and delete operations in one transaction."""
+    return await batch(
+        db_session=db_session, operations=batch_in.operations, mode=batch_in.mode
+    )
@@ -0,0 +1,205 @@
+import asyncio
+import random
+import secrets
+import signal
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import FrameType
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.exceptions import InvalidProfilerTokenException
+
+TOKEN_HEADER = "X-Profiler-Token"
+PROFILES_PATH = "/debug/profiles"
+
+
+@dataclass
+class RequestProfile:
+    method: str
+    path: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    duration: float = 0.0
+    # Collapsed stacks, root first, and how many samples landed in each.
+    samples: Counter[str] = field(default_factory=Counter)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "samples": sum(self.samples.values()),
+        }
+
+    def collapsed(self) -> str:
+        """Renders the samples in the collapsed format read by flamegraph tools."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.items())
+
+
+# The most recent profiles of this worker process.
+profiles: deque[RequestProfile] = deque(maxlen=settings.PROFILER_MAX_PROFILES)
+
+
+def _collapse(frame: FrameType | None) -> str:
+    """Returns the stack of `frame` below the profiler middleware, root first."""
+    names = []
+    while frame is not None and frame.f_code is not _BOUNDARY:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+
+    return ";".join(reversed(names))
+
+
+class Sampler:
+    """
+    Samples the stack of the event loop while requests are being profiled.
+
+    A CPU-time interval timer interrupts the main thread, which runs the
+    loop, with SIGPROF. A sample is credited to a request only when its
+    task is the one running at that moment, so concurrent requests do not
+    pollute each other's profiles, and time spent waiting on I/O is not
+    sampled. The timer only runs while at least one request is profiled.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._active: dict[asyncio.Task[Any], RequestProfile] = {}
+
+    def available(self) -> bool:
+        # Signal handlers can only run in, and be set from, the main thread.
+        return (
+            hasattr(signal, "setitimer")
+            and threading.current_thread() is threading.main_thread()
+        )
+
+    def start(self, task: asyncio.Task[Any], profile: RequestProfile) -> None:
+        self._active[task] = profile
+        if len(self._active) == 1:
+            signal.signal(signal.SIGPROF, self._sample)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self, task: asyncio.Task[Any]) -> None:
+        self._active.pop(task, None)
+        if not self._active:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+
+    def _sample(self, signum: int, frame: FrameType | None) -> None:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            return
+        profile = self._active.get(task)  # type: ignore[arg-type]
+        if profile is not None:
+            profile.samples[_collapse(frame)] += 1
+
+
+sampler = Sampler(settings.PROFILER_INTERVAL)
+
+
+def _should_profile(scope: Scope) -> bool:
+    token = settings.PROFILER_TOKEN
+    if token is not None:
+        requested = Headers(scope=scope).get(TOKEN_HEADER)
+        if requested is not None and secrets.compare_digest(requested, token):
+            return True
+
+    rate = settings.PROFILER_SAMPLE_RATE
+
+    return rate > 0 and random.random() < rate
+
+
+def _profiled(scope: Scope) -> bool:
+    return (
+        _should_profile(scope)
+        and sampler.available()
+        # Reading profiles would otherwise push the real ones out.
+        and not scope["path"].startswith(PROFILES_PATH)
+    )
+
+
+class ProfilerMiddleware:
+    """
+    Runs the sampling profiler around requests that ask for it.
+
+    A request is profiled when it carries the `X-Profiler-Token` header
+    with `PROFILER_TOKEN`, or when it is picked at `PROFILER_SAMPLE_RATE`.
+    Its profile id is returned in the `X-Profile-Id` response header.
+    Other requests only pay for that check. Work done outside the event
+    loop thread, e.g. in the threadpool, is not sampled.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _profiled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(method=scope["method"], path=scope["path"])
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile.id
+            await send(message)
+
+        task = asyncio.current_task()
+        assert task is not None
+        start = time.perf_counter()
+        sampler.start(task, profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop(task)
+            profile.duration = time.perf_counter() - start
+            profiles.append(profile)
+
+
+# Stacks are cut at the middleware, above which every request looks the same.
+_BOUNDARY = ProfilerMiddleware.__call__.__code__
+
+
+def verify_profiler_token(
+    token: Annotated[str | None, Header(alias=TOKEN_HEADER)] = None
+) -> None:
+    if settings.PROFILER_TOKEN is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if token is None or not secrets.compare_digest(token, settings.PROFILER_TOKEN):
+        raise InvalidProfilerTokenException()
+
+
+profiles_router = APIRouter(
+    prefix=PROFILES_PATH, dependencies=[Depends(verify_profiler_token)]
+)
+
+
+@profiles_router.get("")
+async def get_profiles() -> list[dict[str, Any]]:
+    """List the profiles kept by this worker, most recent first."""
+    return [profile.summary() for profile in reversed(profiles)]
+
+
+@profiles_router.get("/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str) -> str:
+    """Return a profile as collapsed stacks, e.g. for flamegraph.pl or speedscope."""
+    for profile in profiles:
+        if profile.id == profile_id:
+            return profile.collapsed()
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Profile with id `{profile_id}` does not exist.",
+    )
@@ -0,0 +1,224 @@
+import gzip
+import hashlib
+import logging
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass
+from inspect import isawaitable
+from typing import Any, TypeVar, get_type_hints
+
+import orjson
+from fastapi.routing import APIRoute
+from fastapi_cache import FastAPICache
+from fastapi_cache.types import KeyBuilder
+from pydantic import TypeAdapter, ValidationError
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+
+from app.config import settings
+from app.metrics import response_cache_requests
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass(frozen=True)
+class ResponseCachePolicy:
+    expire: int
+    key_builder: KeyBuilder
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Returns whether an Accept-Encoding header allows gzip, given its q-values."""
+    qualities = {}
+    for entry in accept_encoding.split(","):
+        coding, _, params = entry.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A rendered response body, stored alongside its gzipped form."""
+
+    status_code: int
+    media_type: str | None
+    etag: str
+    body: bytes
+    gzipped: bytes | None
+
+    @classmethod
+    def from_response(cls, response: Response) -> "CachedResponse":
+        body = bytes(response.body)
+        gzipped = None
+        if len(body) >= settings.RESPONSE_CACHE_GZIP_MIN_SIZE:
+            gzipped = gzip.compress(
+                body, compresslevel=settings.RESPONSE_CACHE_GZIP_LEVEL, mtime=0
+            )
+
+        return cls(
+            status_code=response.status_code,
+            media_type=response.media_type,
+            # Weak, since the gzipped and the plain body share it.
+            etag=f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            body=body,
+            gzipped=gzipped,
+        )
+
+    def dumps(self) -> bytes:
+        header = orjson.dumps(
+            {
+                "status_code": self.status_code,
+                "media_type": self.media_type,
+                "etag": self.etag,
+                "size": len(self.body),
+            }
+        )
+
+        return b"\n".join((header, self.body + (self.gzipped or b"")))
+
+    @classmethod
+    def loads(cls, value: bytes) -> "CachedResponse":
+        raw_header, _, bodies = value.partition(b"\n")
+        header = orjson.loads(raw_header)
+        size = header.pop("size")
+
+        return cls(**header, body=bodies[:size], gzipped=bodies[size:] or None)
+
+    def respond(self, request: Request, status: str) -> Response:
+        """Writes the stored bytes out, or a 304 if the client has them already."""
+        # Writes invalidate the server-side entry only, so clients are kept
+        # to a short max-age and otherwise revalidate with the ETag.
+        max_age = settings.RESPONSE_CACHE_CLIENT_MAX_AGE
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": f"max-age={max_age}" if max_age > 0 else "no-cache",
+            "Vary": "Accept-Encoding",
+            FastAPICache.get_cache_status_header(): status,
+        }
+
+        if_none_match = request.headers.get("if-none-match", "")
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        if self.etag in tags or "*" in tags:
+            return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+
+        body = self.body
+        if self.gzipped is not None and _accepts_gzip(
+            request.headers.get("accept-encoding", "")
+        ):
+            body = self.gzipped
+            headers["Content-Encoding"] = "gzip"
+
+        return Response(
+            body,
+            status_code=self.status_code,
+            media_type=self.media_type,
+            headers=headers,
+        )
+
+
+def cache_response(*, expire: int, key_builder: KeyBuilder) -> Callable[[F], F]:
+    """
+    Caches the rendered response of an endpoint served by a `CachedRoute`.
+
+    The entry holds the final body bytes, gzipped and plain, with their
+    content type and ETag. A hit is answered from those bytes before any
+    dependency is resolved, so neither the database nor pydantic is
+    touched; only endpoints whose dependencies have no side effects and
+    perform no authorization may be cached this way.
+    """
+
+    def decorator(func: F) -> F:
+        func.response_cache = ResponseCachePolicy(  # type: ignore[attr-defined]
+            expire=expire, key_builder=key_builder
+        )
+        return func
+
+    return decorator
+
+
+class CachedRoute(APIRoute):
+    """A route serving endpoints marked with `cache_response` from the cache."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        policy: ResponseCachePolicy | None = getattr(
+            self.endpoint, "response_cache", None
+        )
+        if policy is None:
+            return handler
+
+        # Path parameters are validated as the endpoint declares them, so that
+        # e.g. `/products/01` and `/products/1` build the same key.
+        hints = get_type_hints(self.endpoint, include_extras=True)
+        adapters = {
+            name: TypeAdapter(hints.get(name, str)) for name in self.param_convertors
+        }
+
+        async def cached_handler(request: Request) -> Response:
+            if (
+                not FastAPICache.get_enable()
+                or request.method != "GET"
+                or "no-store" in request.headers.get("cache-control", "")
+            ):
+                return await handler(request)
+
+            try:
+                path_params = {
+                    name: adapter.validate_python(request.path_params[name])
+                    for name, adapter in adapters.items()
+                }
+            except ValidationError:
+                # Let FastAPI report it.
+                return await handler(request)
+
+            key = policy.key_builder(
+                self.endpoint,
+                f"{FastAPICache.get_prefix()}:response",
+                request=request,
+                response=None,
+                args=(),
+                kwargs=path_params,
+            )
+            if isawaitable(key):
+                key = await key
+            backend = FastAPICache.get_backend()
+
+            if "no-cache" not in request.headers.get("cache-control", ""):
+                try:
+                    value = await backend.get(key)
+                except Exception:
+                    logger.warning("Could not read cached response", exc_info=True)
+                    value = None
+                if value is not None:
+                    response_cache_requests.inc("HIT")
+                    return CachedResponse.loads(value).respond(request, "HIT")
+
+            response_cache_requests.inc("MISS")
+            response = await handler(request)
+            if (
+                response.status_code != HTTP_200_OK
+                or not hasattr(response, "body")
+                or "set-cookie" in response.headers
+            ):
+                return response
+
+            entry = CachedResponse.from_response(response)
+            try:
+                await backend.set(key, entry.dumps(), policy.expire)
+            except Exception:
+                logger.warning("Could not cache response", exc_info=True)
+
+            return entry.respond(request, "MISS")
+
+        return cached_handler
@@ -1,12 +1,33 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, TypeVar
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.config import settings
+from app.exceptions import ServiceUnavailableException
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+# Pinning the minimum and maximum rounds to the configured cost makes
+# `verify_and_update` flag hashes made with any other cost for rehashing.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a thread pool is enough to keep
+# hashing off the event loop.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_pending_hashes = 0
 
 
 def create_access_token(data: dict[str, Any]) -> str:
@@ -24,9 +45,39 @@ def create_access_token(data: dict[str, Any]) -> str:
     return encoded_jwt
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def _run_hash(func: Callable[..., T], *args: Any) -> T:
+    """
+    Runs a password hashing function in the hashing thread pool.
+
+    Rejects the call with a 503 instead of queueing it once
+    `PASSWORD_HASH_MAX_PENDING` calls are already running or waiting.
+    """
+    global _pending_hashes
+
+    if _pending_hashes >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise ServiceUnavailableException()
+
+    _pending_hashes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _pending_hashes -= 1
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verifies a password and returns a new hash if the stored one is outdated.
+
+    The new hash is only returned for a correct password whose stored hash
+    was made with a different cost than `BCRYPT_ROUNDS`.
+    """
+    return await _run_hash(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    return await _run_hash(pwd_context.hash, password)
@@ -0,0 +1,36 @@
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+from sqlalchemy.engine import Row
+from starlette.responses import Response
+
+
+def _default(value: Any) -> Any:
+    """Encodes the types orjson does not handle natively."""
+    if isinstance(value, Row):
+        return value._asdict()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(payload: Any) -> bytes:
+    return orjson.dumps(payload, default=_default)
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+
+def json_response(payload: Any) -> JSONBytesResponse:
+    """
+    Encodes rows and plain values straight into a JSON response.
+
+    FastAPI passes `Response` instances through untouched, so the payload
+    is neither validated against the route's `response_model` nor walked
+    by `jsonable_encoder`. The caller is responsible for its shape: rows
+    must hold exactly the fields of the declared read schema.
+    """
+    return JSONBytesResponse(dumps(payload))
@@ -0,0 +1,262 @@
+"""
+Checks the query plans emitted by the service layer against a seeded database.
+
+Every scenario below calls a service function inside a transaction that
+is rolled back at the end. The statements it sends are captured and run
+again through `EXPLAIN (FORMAT JSON)`. The check fails when a plan falls
+back to a sequential scan on a table larger than `--threshold` rows.
+
+Usage:
+    python -m app.tools.explain --seed 200000
+    python -m app.tools.explain --threshold 10000
+"""
+
+import argparse
+import asyncio
+import sys
+from collections.abc import Awaitable, Callable, Iterator
+from typing import Any
+from unittest.mock import patch
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.category import service as category_service
+from app.database.core import async_engine
+from app.product import service as product_service
+from app.product.models import ProductCursor, ProductOrder
+from app.tools.seed import seed_catalog
+
+Scenario = Callable[[AsyncSession, dict[str, Any]], Awaitable[Any]]
+
+# Categories created when the database is seeded.
+CATEGORIES = 100
+
+# Statements that EXPLAIN accepts.
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+async def _first_partition(db_session: AsyncSession, **filters: Any) -> None:
+    async for _ in product_service.stream_all(
+        db_session=db_session, fetch_size=100, **filters
+    ):
+        break
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "category.get": lambda s, ids: category_service.get(
+        db_session=s, category_id=ids["category_id"]
+    ),
+    "category.get_by_name": lambda s, ids: category_service.get_by_name(
+        db_session=s, category_name=ids["category_name"]
+    ),
+    "category.suggest": lambda s, ids: category_service.suggest(
+        db_session=s, prefix=ids["category_name"][:3], limit=10
+    ),
+    "product.get": lambda s, ids: product_service.get(
+        db_session=s, product_id=ids["product_id"]
+    ),
+    "product.get_by_name": lambda s, ids: product_service.get_by_name(
+        db_session=s, product_name=ids["product_name"]
+    ),
+    "product.get_all": lambda s, ids: product_service.get_all(
+        db_session=s,
+        min_price=None,
+        max_price=None,
+        category_ids=None,
+        order_by=ProductOrder.id,
+        after=ProductCursor(order_by=ProductOrder.id, id=ids["product_id"]),
+        limit=50,
+    ),
+    "product.get_all[price]": lambda s, ids: product_service.get_all(
+        db_session=s,
+        min_price=100,
+        max_price=110,
+        category_ids=None,
+        order_by=ProductOrder.price,
+        after=None,
+        limit=50,
+    ),
+    "product.get_all[categories]": lambda s, ids: product_service.get_all(
+        db_session=s,
+        min_price=None,
+        max_price=None,
+        category_ids=[ids["category_id"]],
+        order_by=ProductOrder.id,
+        after=None,
+        limit=50,
+    ),
+    "product.get_all[categories,price]": lambda s, ids: product_service.get_all(
+        db_session=s,
+        min_price=100,
+        max_price=500,
+        category_ids=[ids["category_id"]],
+        order_by=ProductOrder.price,
+        after=ProductCursor(order_by=ProductOrder.price, id=1, price=150),
+        limit=50,
+    ),
+    "product.get_products_by_category": lambda s, ids: (
+        product_service.get_products_by_category(
+            db_session=s,
+            category_id=ids["category_id"],
+            order_by=ProductOrder.id,
+            after=ProductCursor(order_by=ProductOrder.id, id=ids["product_id"]),
+            limit=50,
+        )
+    ),
+    "product.get_products_by_category[price]": lambda s, ids: (
+        product_service.get_products_by_category(
+            db_session=s,
+            category_id=ids["category_id"],
+            order_by=ProductOrder.price,
+            after=None,
+            limit=50,
+        )
+    ),
+    "product.get_facets[categories]": lambda s, ids: product_service.get_facets(
+        db_session=s,
+        min_price=None,
+        max_price=None,
+        category_ids=[ids["category_id"]],
+        buckets=10,
+    ),
+    "product.search": lambda s, ids: product_service.search(
+        db_session=s,
+        terms=ids["product_name"],
+        min_price=None,
+        max_price=None,
+        category_ids=None,
+        after=None,
+        limit=50,
+    ),
+    "product.suggest": lambda s, ids: product_service.suggest(
+        db_session=s, prefix=ids["product_name"][:3], limit=10
+    ),
+    "product.stream_all[categories]": lambda s, ids: _first_partition(
+        s, min_price=None, max_price=None, category_ids=[ids["category_id"]]
+    ),
+    "product.delete": lambda s, ids: product_service.delete(
+        db_session=s, product_id=ids["product_id"]
+    ),
+}
+
+
+async def _no_bump(*scopes: str) -> None:
+    pass
+
+
+def seq_scans(plan: dict[str, Any]) -> Iterator[str]:
+    """Yields the relations read by sequential scans anywhere in a plan."""
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+async def check(threshold: int) -> list[str]:
+    """Runs every scenario and returns the plans that fail the check."""
+    captured: list[tuple[str, Any]] = []
+    failures: list[str] = []
+
+    def capture(
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        # Leaves out transaction control, e.g. the session's savepoints.
+        if statement.lstrip().upper().startswith(EXPLAINABLE):
+            captured.append((statement, parameters))
+
+    async with async_engine.connect() as connection:
+        rows = await connection.execute(
+            text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'")
+        )
+        sizes = dict(rows.tuples().all())
+        rows = await connection.execute(
+            text(
+                "SELECT c.id AS category_id, c.name AS category_name, "
+                "p.id AS product_id, p.name AS product_name "
+                "FROM products p JOIN categories c ON c.id = p.category_id "
+                "ORDER BY p.id DESC LIMIT 1"
+            )
+        )
+        row = rows.one_or_none()
+        if row is None:
+            return ["the catalog is empty, pass --seed to fill it"]
+        ids = row._asdict()
+
+        # The session joins the connection's transaction through savepoints,
+        # so the writes made by the scenarios are rolled back at the end.
+        db_session = AsyncSession(
+            bind=connection, join_transaction_mode="create_savepoint"
+        )
+
+        for name, scenario in SCENARIOS.items():
+            captured.clear()
+            event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+            # The writes are rolled back, so the live cache must not be bumped.
+            try:
+                with patch.object(product_service, "bump_generation", _no_bump):
+                    await scenario(db_session, ids)
+            finally:
+                event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+            for statement, parameters in captured:
+                result = await connection.exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) {statement}", parameters
+                )
+                plan = result.scalar_one()[0]["Plan"]
+                scans = [
+                    relation
+                    for relation in seq_scans(plan)
+                    if sizes.get(relation, 0) > threshold
+                ]
+                verdict = "FAIL" if scans else "ok"
+                print(f"{verdict:4} {name}: {plan['Node Type']} ({plan['Total Cost']})")
+                if scans:
+                    failures.append(f"{name}: seq scan on {', '.join(scans)}")
+
+        await db_session.close()
+        await connection.rollback()
+
+    return failures
+
+
+async def run(products: int | None, threshold: int) -> int:
+    if products:
+        async with async_engine.connect() as connection:
+            await seed_catalog(connection, categories=CATEGORIES, products=products)
+
+    failures = await check(threshold)
+    await async_engine.dispose()
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--seed",
+        type=int,
+        metavar="PRODUCTS",
+        help="insert synthetic rows until the catalog holds this many products",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=10_000,
+        help="fail on sequential scans of tables larger than this (default: 10000)",
+    )
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.seed, args.threshold)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Bulk imports products from a CSV or NDJSON file.
+
+Usage:
+    python -m app.tools.import_products products.csv
+    python -m app.tools.import_products feed.ndjson --update-existing
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from app.database.core import async_session
+from app.exceptions import InvalidCatalogFileException
+from app.product.bulk import PARSERS, import_products
+from app.product.models import CatalogFormat, ImportReport, ImportRowError
+
+
+async def run(path: Path, import_format: CatalogFormat, update_existing: bool) -> None:
+    errors: list[ImportRowError] = []
+
+    with path.open(encoding="utf-8", newline="") as file:
+        async with async_session() as db_session:
+            report: ImportReport = await import_products(
+                db_session=db_session,
+                records=PARSERS[import_format](file, errors),
+                errors=errors,
+                update_existing=update_existing,
+            )
+
+    print(report.model_dump_json(indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", type=Path, help="CSV or NDJSON file to import")
+    parser.add_argument(
+        "--format",
+        dest="import_format",
+        choices=[import_format.value for import_format in CatalogFormat],
+        help="file format, guessed from the file extension by default",
+    )
+    parser.add_argument(
+        "--update-existing",
+        action="store_true",
+        help="update products whose name already exists",
+    )
+    args = parser.parse_args()
+
+    import_format = args.import_format or args.path.suffix.lstrip(".").lower()
+    if import_format not in CatalogFormat.__members__:
+        parser.error("could not guess the file format, pass --format explicitly")
+
+    try:
+        asyncio.run(run(args.path, CatalogFormat(import_format), args.update_existing))
+    except InvalidCatalogFileException as exc:
+        sys.exit(f"error: {exc.detail}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Fills the database with a synthetic catalog and users for load tests.
+
+Categories, products and users are generated deterministically from
+`--seed` and bulk-loaded with COPY. Each table is grown to the requested
+number of rows: the rows already present are kept, and every generated
+row depends only on the seed and its id, so growing a catalog in steps
+yields the same rows as seeding it at once. All users share one password,
+hashed once up front.
+
+Usage:
+    python -m app.tools.seed --categories 1000 --products 1000000 --users 10000
+    python -m app.tools.seed --products 200000 --seed 7 --reset
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from collections.abc import Callable, Iterator, Sequence
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.database.core import async_engine
+from app.security import get_password_hash
+
+ADJECTIVES = [
+    "alpine", "classic", "compact", "digital", "electric", "folding", "heated",
+    "modular", "nordic", "outdoor", "pocket", "portable", "quilted", "recycled",
+    "rugged", "slim", "smart", "solar", "thermal", "travel", "vintage",
+    "waterproof", "wireless",
+]  # fmt: skip
+MATERIALS = [
+    "amber", "bamboo", "canvas", "carbon", "cedar", "ceramic", "copper",
+    "cotton", "crystal", "denim", "glass", "granite", "leather", "linen",
+    "marble", "merino", "oak", "rattan", "satin", "silver", "steel", "suede",
+    "teak", "titanium", "velvet", "walnut", "wool",
+]  # fmt: skip
+NOUNS = [
+    "backpack", "bench", "blanket", "bottle", "chair", "desk", "jacket",
+    "kettle", "lamp", "mirror", "mug", "pillow", "rug", "scarf", "shelf",
+    "speaker", "stool", "table", "tent", "vase", "wallet", "watch",
+]  # fmt: skip
+USES = [
+    "the home", "the office", "travel", "the outdoors", "small spaces",
+    "the kitchen", "everyday carry", "gifting",
+]  # fmt: skip
+FEATURES = [
+    "Built to last.", "Easy to clean.", "Ships fully assembled.",
+    "Backed by a two-year warranty.", "Designed for everyday use.",
+    "Lightweight and durable.", "Made from responsibly sourced materials.",
+    "Available while stocks last.",
+]  # fmt: skip
+
+# Words found in generated names and descriptions, e.g. for search queries.
+WORDS = ADJECTIVES + MATERIALS + NOUNS
+
+# Rows are generated in blocks, each from its own seeded generator.
+BLOCK_SIZE = 1000
+
+SEED_EMAIL_DOMAIN = "seed.example.com"
+
+Row = tuple[Any, ...]
+
+
+def _generate(
+    seed: int, table: str, start: int, stop: int, make_row: Callable[..., Row]
+) -> Iterator[Row]:
+    """Yields the rows with ids in [start, stop), each derived from its id."""
+    for block in range(start // BLOCK_SIZE, (stop - 1) // BLOCK_SIZE + 1):
+        rng = random.Random(f"{seed}:{table}:{block}")
+        for row_id in range(block * BLOCK_SIZE, (block + 1) * BLOCK_SIZE):
+            # Rows before `start` are still generated, to keep the sequence.
+            row = make_row(rng, row_id)
+            if row_id >= stop:
+                return
+            if row_id >= start:
+                yield row
+
+
+def _category(rng: random.Random, row_id: int) -> Row:
+    adjective, noun = rng.choice(ADJECTIVES), rng.choice(NOUNS)
+    description = (
+        f"{adjective.capitalize()} {noun}s for {rng.choice(USES)}."
+        if rng.random() < 0.8
+        else None
+    )
+
+    return (
+        row_id,
+        f"{adjective.capitalize()} {noun.capitalize()}s {row_id}",
+        description,
+    )
+
+
+def _product(
+    category_ids: Sequence[int], cum_weights: Sequence[float]
+) -> Callable[[random.Random, int], Row]:
+    def product(rng: random.Random, row_id: int) -> Row:
+        adjective, material, noun = (
+            rng.choice(ADJECTIVES),
+            rng.choice(MATERIALS),
+            rng.choice(NOUNS),
+        )
+        name = f"{adjective.capitalize()} {material} {noun} {row_id:06X}"
+
+        description = None
+        if rng.random() < 0.95:
+            features = rng.sample(FEATURES, rng.randint(0, 3))
+            description = " ".join(
+                [f"{material.capitalize()} {noun} for {rng.choice(USES)}.", *features]
+            )
+
+        # Most products are cheap, a few are very expensive; some are unpriced.
+        price = None
+        if rng.random() < 0.99:
+            price = round(min(max(rng.lognormvariate(3.5, 1.0), 0.5), 10000.0), 2)
+
+        (category_id,) = rng.choices(category_ids, cum_weights=cum_weights)
+
+        return row_id, name, description, price, category_id
+
+    return product
+
+
+def _user(password_hash: str) -> Callable[[random.Random, int], Row]:
+    def user(rng: random.Random, row_id: int) -> Row:
+        return row_id, f"user{row_id}@{SEED_EMAIL_DOMAIN}", password_hash, None
+
+    return user
+
+
+async def _grow(
+    connection: AsyncConnection,
+    table: str,
+    columns: Sequence[str],
+    rows: int,
+    seed: int,
+    make_row: Callable[[random.Random, int], Row],
+) -> int:
+    """COPYs generated rows into `table` until it holds `rows` of them."""
+    result = await connection.execute(
+        text(f"SELECT count(*), coalesce(max(id), 0) FROM {table}")
+    )
+    count, last_id = result.one()
+    missing = rows - count
+    if missing <= 0:
+        return 0
+
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(  # type: ignore
+        table,
+        records=_generate(seed, table, last_id + 1, last_id + 1 + missing, make_row),
+        columns=list(columns),
+    )
+    # The ids were given explicitly, so the sequence has to catch up.
+    await connection.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT max(id) FROM {table}))"
+        )
+    )
+
+    return missing
+
+
+async def seed_catalog(
+    connection: AsyncConnection,
+    *,
+    categories: int,
+    products: int,
+    users: int = 0,
+    password: str = "password",
+    seed: int = 0,
+) -> dict[str, int]:
+    """
+    Grows each table to the given number of rows, then analyzes them.
+
+    Products are spread over all categories with a long-tailed
+    distribution, so a few categories hold most of the catalog. Returns
+    the number of rows added to each table.
+    """
+    added = {
+        "categories": await _grow(
+            connection,
+            "categories",
+            ("id", "name", "description"),
+            categories,
+            seed,
+            _category,
+        )
+    }
+
+    result = await connection.execute(text("SELECT id FROM categories ORDER BY id"))
+    category_ids = result.scalars().all()
+    if products and not category_ids:
+        raise ValueError("Products need at least one category.")
+    cum_weights = list(
+        itertools.accumulate(1 / (rank + 1) ** 0.9 for rank in range(len(category_ids)))
+    )
+    added["products"] = await _grow(
+        connection,
+        "products",
+        ("id", "name", "description", "price", "category_id"),
+        products,
+        seed,
+        _product(category_ids, cum_weights),
+    )
+
+    added["users"] = 0
+    if users:
+        added["users"] = await _grow(
+            connection,
+            "users",
+            ("id", "email", "password", "google_id"),
+            users,
+            seed,
+            _user(await get_password_hash(password)),
+        )
+
+    await connection.commit()
+    for table, count in added.items():
+        if count:
+            await connection.execute(text(f"ANALYZE {table}"))
+    await connection.commit()
+
+    return added
+
+
+async def run(
+    categories: int, products: int, users: int, password: str, seed: int, reset: bool
+) -> None:
+    start = time.perf_counter()
+
+    async with async_engine.connect() as connection:
+        if reset:
+            await connection.execute(
+                text("TRUNCATE products, categories, users RESTART IDENTITY CASCADE")
+            )
+        added = await seed_catalog(
+            connection,
+            categories=categories,
+            products=products,
+            users=users,
+            password=password,
+            seed=seed,
+        )
+
+    await async_engine.dispose()
+
+    for table, count in added.items():
+        print(f"{table}: {count} rows added")
+    if added["users"]:
+        print(f"users sign in as user<id>@{SEED_EMAIL_DOMAIN} / {password}")
+    print(f"done in {time.perf_counter() - start:.1f} s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--categories", type=int, default=100, help="default: 100")
+    parser.add_argument("--products", type=int, default=10000, help="default: 10000")
+    parser.add_argument("--users", type=int, default=0, help="default: 0")
+    parser.add_argument(
+        "--password",
+        default="password",
+        help="password of every seeded user (default: password)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="default: 0")
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="delete all products, categories and users first",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(
+        run(
+            args.categories,
+            args.products,
+            args.users,
+            args.password,
+            args.seed,
+            args.reset,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
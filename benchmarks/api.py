@@ -0,0 +1,328 @@
+"""
+Measures the throughput and latency of the API hot paths, end to end.
+
+`app.main.app` is driven in-process through an ASGI transport against
+the configured PostgreSQL database, with Redis, the response cache and
+the Hunter.io and Google calls replaced by the in-memory stand-ins of
+`benchmarks.standins`. The products, categories and users added by the
+run, seeded or written, are deleted at the end. Each scenario reports
+req/s and p50/p95/p99 latency. Results can be saved as JSON and
+compared against a baseline saved the same way; the run fails when a
+scenario's p95 latency rises, or its throughput drops, by more than
+`--tolerance`.
+
+Usage:
+    python -m benchmarks.api --output baseline.json
+    python -m benchmarks.api --baseline baseline.json --tolerance 0.1
+    python -m benchmarks.api --catalog-sizes 1000 100000 --requests 200
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+from sqlalchemy import text
+
+from app.config import settings
+from app.database.core import async_engine
+from app.main import app
+from app.tools.seed import seed_catalog
+
+from .search import CATEGORIES
+from .standins import install
+
+API = settings.API_V1_STR
+BENCH_DOMAIN = "bench.example.com"
+BENCH_USER = {"email": f"bench-user@{BENCH_DOMAIN}", "password": "bench-password"}
+# Recomputes a cached response instead of serving it.
+COLD = {"Cache-Control": "no-cache"}
+
+Send = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    send: Send
+    requests: int
+    status: int = 200
+
+
+async def measure(
+    client: httpx.AsyncClient, scenario: Scenario, concurrency: int
+) -> dict[str, Any]:
+    """Sends the scenario's requests from `concurrency` concurrent clients."""
+    warmup = min(10, scenario.requests)
+    for i in range(warmup):
+        await scenario.send(client, i)
+
+    timings: list[float] = []
+    errors = 0
+    # Indexes continue after the warm-up, e.g. so created names stay unique.
+    indexes = itertools.count(warmup)
+
+    async def worker() -> None:
+        nonlocal errors
+        while (i := next(indexes)) < warmup + scenario.requests:
+            start = time.perf_counter()
+            response = await scenario.send(client, i)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != scenario.status:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(timings, n=100)
+
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "rps": len(timings) / elapsed,
+        "p50_ms": quantiles[49],
+        "p95_ms": quantiles[94],
+        "p99_ms": quantiles[98],
+    }
+
+
+async def sign_in(client: httpx.AsyncClient) -> str:
+    """Returns an access token for the benchmark user, signing it up if needed."""
+    await client.post(f"{API}/auth/signup", json=BENCH_USER)
+    response = await client.post(
+        f"{API}/auth/signin",
+        data={"username": BENCH_USER["email"], "password": BENCH_USER["password"]},
+    )
+    response.raise_for_status()
+
+    return response.json()["access_token"]
+
+
+def build_scenarios(
+    token: str, category_id: int, run_id: str, requests: int
+) -> list[Scenario]:
+    created: list[int] = []
+    # Sign-ins are dominated by bcrypt, by design; fewer of them suffice.
+    slow = max(requests // 10, 20)
+
+    async def signin(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post(
+            f"{API}/auth/signin",
+            data={"username": BENCH_USER["email"], "password": BENCH_USER["password"]},
+        )
+
+    async def google_signin(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        code = f"bench-google-{i % 20}"
+        return await client.get(f"{API}/google/auth/callback", params={"code": code})
+
+    async def me(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get(
+            f"{API}/auth/me", headers={"Authorization": f"Bearer {token}"}
+        )
+
+    async def categories_cold(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get(f"{API}/categories/", headers=COLD)
+
+    async def categories_warm(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get(f"{API}/categories/")
+
+    async def category_warm(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get(f"{API}/categories/{category_id}")
+
+    async def create_product(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        response = await client.post(
+            f"{API}/products/",
+            json={
+                "name": f"bench-write-{run_id}-{i}",
+                "description": "Benchmark product",
+                "price": 10 + i % 90,
+                "category_id": category_id,
+            },
+        )
+        if response.status_code == 201:
+            created.append(response.json()["id"])
+        return response
+
+    async def update_product(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        product_id = created[i % len(created)]
+        return await client.put(
+            f"{API}/products/{product_id}", json={"price": 20 + i % 80}
+        )
+
+    return [
+        Scenario("auth.signin", signin, slow),
+        Scenario("auth.google_signin", google_signin, slow),
+        Scenario("auth.me", me, requests),
+        Scenario("categories.list[cold]", categories_cold, requests),
+        Scenario("categories.list[warm]", categories_warm, requests),
+        Scenario("categories.get[warm]", category_warm, requests),
+        Scenario("products.create", create_product, requests, status=201),
+        Scenario("products.update", update_product, requests),
+    ]
+
+
+def listing_scenario(size: int, requests: int) -> Scenario:
+    async def list_products(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get(
+            f"{API}/products/",
+            params={"min_price": i % 900, "order_by": "price", "limit": 50},
+            headers=COLD,
+        )
+
+    return Scenario(f"products.list[{size}]", list_products, requests)
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Returns a description of each regression from the baseline."""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']:.2f} ms, "
+                f"baseline {base['p95_ms']:.2f} ms"
+            )
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {result['rps']:.0f} req/s, baseline {base['rps']:.0f} req/s"
+            )
+
+    return regressions
+
+
+async def last_ids() -> tuple[int, int]:
+    """Returns the highest product and category ids in the database."""
+    async with async_engine.connect() as connection:
+        result = await connection.execute(
+            text(
+                "SELECT (SELECT coalesce(max(id), 0) FROM products), "
+                "(SELECT coalesce(max(id), 0) FROM categories)"
+            )
+        )
+
+    return result.one()  # type: ignore[return-value]
+
+
+async def cleanup(last_product_id: int, last_category_id: int) -> None:
+    """Removes the rows seeded or written by the run."""
+    async with async_engine.begin() as connection:
+        await connection.execute(
+            text("DELETE FROM products WHERE id > :id"), {"id": last_product_id}
+        )
+        await connection.execute(
+            text("DELETE FROM categories WHERE id > :id"), {"id": last_category_id}
+        )
+        await connection.execute(
+            text("DELETE FROM users WHERE email LIKE :domain"),
+            {"domain": f"%@{BENCH_DOMAIN}"},
+        )
+
+
+async def run(
+    catalog_sizes: list[int], requests: int, concurrency: int
+) -> dict[str, Any]:
+    install(app)
+    transport = httpx.ASGITransport(app=app)
+    results: dict[str, Any] = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "requests": requests,
+        "concurrency": concurrency,
+        "scenarios": {},
+    }
+
+    def report(name: str, result: dict[str, Any]) -> None:
+        results["scenarios"][name] = result
+        print(
+            f"{name:<28} {result['rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f}  "
+            f"p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms  "
+            f"errors {result['errors']}"
+        )
+
+    last_product_id, last_category_id = await last_ids()
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            for size in sorted(catalog_sizes):
+                async with async_engine.connect() as connection:
+                    await seed_catalog(connection, categories=CATEGORIES, products=size)
+                scenario = listing_scenario(size, requests)
+                report(scenario.name, await measure(client, scenario, concurrency))
+
+            async with async_engine.connect() as connection:
+                category_id = await connection.scalar(
+                    text("SELECT min(id) FROM categories")
+                )
+            token = await sign_in(client)
+            run_id = uuid.uuid4().hex[:8]
+            for scenario in build_scenarios(token, category_id, run_id, requests):
+                report(scenario.name, await measure(client, scenario, concurrency))
+    finally:
+        await cleanup(last_product_id, last_category_id)
+        await app.state.http_client.aclose()
+        await async_engine.dispose()
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--catalog-sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="grow the catalog to each size and list products (default: 1000 "
+        "10000 100000)",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=500, help="per scenario (default: 500)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="concurrent clients (default: 10)"
+    )
+    parser.add_argument("--output", type=Path, help="save the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="allowed p95 and req/s change from the baseline (default: 0.1)",
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.catalog_sizes, args.requests, args.concurrency))
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    failed = any(result["errors"] for result in results["scenarios"].values())
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        for regression in compare(results, baseline, args.tolerance):
+            print(f"REGRESSION {regression}", file=sys.stderr)
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
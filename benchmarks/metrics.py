@@ -0,0 +1,116 @@
+"""
+Measures the per-request overhead of `app.metrics.MetricsMiddleware`.
+
+A bare ASGI app standing in for a routed endpoint is called directly,
+with and without the middleware, so that the difference is the cost of
+recording the request. The run fails when that cost exceeds
+`--budget-us`. The time taken to render a scrape is reported as well.
+
+Usage:
+    python -m benchmarks.metrics
+    python -m benchmarks.metrics --requests 200000 --budget-us 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from fastapi.routing import APIRoute
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import MetricsMiddleware, registry
+
+ROUTE = APIRoute("/items/{item_id}", lambda item_id: None)
+
+
+async def endpoint(scope: Scope, receive: Receive, send: Send) -> None:
+    # What the router leaves in the scope for the middleware to read.
+    scope["route"] = ROUTE
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def call(app: ASGIApp, path: str) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "server": ("bench", 80),
+        "client": ("bench", 1234),
+    }
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app: ASGIApp, requests: int) -> float:
+    """Returns the mean duration of a request, in microseconds."""
+    paths = [f"/items/{i}" for i in range(100)]
+
+    start = time.perf_counter()
+    for i in range(requests):
+        await call(app, paths[i % len(paths)])
+
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+async def run(requests: int, rounds: int, budget: float) -> int:
+    FastAPICache.init(InMemoryBackend())
+    instrumented = MetricsMiddleware(endpoint)
+
+    overheads = []
+    for _ in range(rounds):
+        without = await measure(endpoint, requests)
+        with_metrics = await measure(instrumented, requests)
+        overheads.append(with_metrics - without)
+        print(
+            f"without {without:.1f} us, with {with_metrics:.1f} us, "
+            f"overhead {with_metrics - without:.1f} us per request"
+        )
+
+    start = time.perf_counter()
+    scrape = registry.render()
+    render_ms = (time.perf_counter() - start) * 1000
+    print(f"scrape: {len(scrape.splitlines())} lines rendered in {render_ms:.2f} ms")
+
+    overhead = statistics.median(overheads)
+    if overhead > budget:
+        print(f"FAIL overhead above the {budget} us budget", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100000, help="default: 100000")
+    parser.add_argument("--rounds", type=int, default=5, help="default: 5")
+    parser.add_argument(
+        "--budget-us",
+        type=float,
+        default=10.0,
+        help="fail when the median overhead exceeds this (default: 10)",
+    )
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.requests, args.rounds, args.budget_us)))
+
+
+if __name__ == "__main__":
+    main()
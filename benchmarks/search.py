@@ -0,0 +1,101 @@
+"""
+Measures the latency of product full-text search against a seeded catalog.
+
+Random one- and two-word queries drawn from the seeding vocabulary are
+sent through `app.product.service.search`. The run fails when the 95th
+percentile exceeds `--budget-ms`.
+
+Usage:
+    python -m benchmarks.search --seed 1000000
+    python -m benchmarks.search --queries 500 --budget-ms 20
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import func, select
+
+from app.database.core import async_engine, async_session
+from app.product import service as product_service
+from app.product.models import Product
+from app.tools.seed import WORDS, seed_catalog
+
+# Categories created when the catalog is seeded.
+CATEGORIES = 100
+
+
+async def measure(queries: int, limit: int) -> list[float]:
+    """Returns the duration of each search, in milliseconds."""
+    rng = random.Random(0)
+    timings: list[float] = []
+
+    async with async_session() as db_session:
+        for attempt in range(queries + 10):
+            terms = " ".join(rng.sample(WORDS, rng.choice((1, 2))))
+            start = time.perf_counter()
+            await product_service.search(
+                db_session=db_session,
+                terms=terms,
+                min_price=None,
+                max_price=None,
+                category_ids=None,
+                after=None,
+                limit=limit,
+            )
+            # The first queries warm up the connection and the caches.
+            if attempt >= 10:
+                timings.append((time.perf_counter() - start) * 1000)
+
+    return timings
+
+
+async def run(products: int | None, queries: int, limit: int, budget: float) -> int:
+    async with async_engine.connect() as connection:
+        if products:
+            await seed_catalog(connection, categories=CATEGORIES, products=products)
+        total = await connection.scalar(select(func.count()).select_from(Product))
+
+    timings = await measure(queries, limit)
+    await async_engine.dispose()
+
+    p95 = statistics.quantiles(timings, n=100)[94]
+    print(f"products: {total}, queries: {len(timings)}, limit: {limit}")
+    print(
+        f"p50 {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms, "
+        f"max {max(timings):.2f} ms"
+    )
+
+    if p95 > budget:
+        print(f"FAIL p95 above the {budget} ms budget", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--seed",
+        type=int,
+        metavar="PRODUCTS",
+        help="insert synthetic rows until the catalog holds this many products",
+    )
+    parser.add_argument("--queries", type=int, default=200, help="default: 200")
+    parser.add_argument("--limit", type=int, default=50, help="page size (default: 50)")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=20.0,
+        help="fail when the p95 latency exceeds this (default: 20)",
+    )
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.seed, args.queries, args.limit, args.budget_ms)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compares the two ways a product list page can be serialized.
+
+`validated` returns ORM objects through `response_model=Page[ProductRead]`,
+so FastAPI validates every row with pydantic and walks it again with
+`jsonable_encoder`. `fast` returns the same rows as SQLAlchemy `Row`s
+through `app.serialization.json_response`, which hands them to orjson
+directly. Both are served by an in-process app over the ASGI transport,
+so no database is needed.
+
+Usage:
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --rows 1000 10000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Sequence
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.engine import IteratorResult, Row
+from sqlalchemy.engine.result import SimpleResultMetaData
+
+from app.pagination import Page
+from app.product.models import Product, ProductRead
+from app.serialization import json_response
+
+COLUMNS = ["id", "name", "description", "price", "category_id"]
+
+
+def make_values(rows: int) -> list[tuple[Any, ...]]:
+    return [
+        (i, f"product {i}", f"description of product {i}", i * 0.25, 1 + i % 100)
+        for i in range(1, rows + 1)
+    ]
+
+
+def make_app(rows: int) -> FastAPI:
+    values = make_values(rows)
+    products = [Product(**dict(zip(COLUMNS, value))) for value in values]
+    result_rows: Sequence[Row[Any]] = IteratorResult(
+        SimpleResultMetaData(COLUMNS), iter(values)
+    ).all()
+
+    app = FastAPI()
+
+    @app.get("/validated", response_model=Page[ProductRead])
+    async def validated() -> Any:
+        return {"items": products, "next_cursor": None}
+
+    @app.get("/fast", response_model=Page[ProductRead])
+    async def fast() -> Any:
+        return json_response({"items": result_rows, "next_cursor": None})
+
+    return app
+
+
+async def measure(rows: int, repeat: int) -> dict[str, list[float]]:
+    """Returns the duration of each request per route, in milliseconds."""
+    timings: dict[str, list[float]] = {"validated": [], "fast": []}
+    transport = httpx.ASGITransport(app=make_app(rows))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        bodies = {path: (await c.get(f"/{path}")).json() for path in timings}
+        assert bodies["validated"] == bodies["fast"], "responses differ"
+
+        for _ in range(repeat):
+            for path, durations in timings.items():
+                start = time.perf_counter()
+                response = await c.get(f"/{path}")
+                response.raise_for_status()
+                durations.append((time.perf_counter() - start) * 1000)
+
+    return timings
+
+
+async def run(rows: list[int], repeat: int) -> None:
+    for count in rows:
+        timings = await measure(count, repeat)
+        validated = statistics.median(timings["validated"])
+        fast = statistics.median(timings["fast"])
+        print(
+            f"{count} rows: validated {validated:.2f} ms, fast {fast:.2f} ms "
+            f"({validated / fast:.1f}x)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="page sizes to serialize (default: 1000 10000 100000)",
+    )
+    parser.add_argument("--repeat", type=int, default=10, help="default: 10")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
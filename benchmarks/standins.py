@@ -0,0 +1,123 @@
+"""
+Local stand-ins for the services the API calls besides PostgreSQL.
+
+`install(app)` swaps them into an application driven in-process over
+ASGI, where the lifespan that normally connects them does not run.
+"""
+
+import sys
+import time
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+
+import app.cache
+from app.cache import CACHE_PREFIX
+from app.http_client import create_http_client
+
+
+def _encode(value: Any) -> bytes:
+    return value if isinstance(value, bytes) else str(value).encode()
+
+
+class MemoryRedis:
+    """The subset of the asyncio Redis client used by the application."""
+
+    def __init__(self) -> None:
+        self._values: dict[str, tuple[bytes, float | None]] = {}
+
+    def _get(self, key: str) -> bytes | None:
+        value, expires = self._values.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            del self._values[key]
+            return None
+
+        return value
+
+    async def get(self, key: str) -> bytes | None:
+        return self._get(key)
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [self._get(key) for key in keys]
+
+    async def set(self, key: str, value: Any, ex: int | None = None) -> bool:
+        expires = time.monotonic() + ex if ex else None
+        self._values[key] = (_encode(value), expires)
+        return True
+
+    async def incr(self, key: str) -> int:
+        value = int(self._get(key) or 0) + 1
+        self._values[key] = (_encode(value), None)
+        return value
+
+    async def publish(self, channel: str, message: Any) -> int:
+        return 0
+
+    def pipeline(self, transaction: bool = True) -> "MemoryPipeline":
+        return MemoryPipeline(self)
+
+    async def close(self) -> None:
+        self._values.clear()
+
+
+class MemoryPipeline:
+    def __init__(self, redis: MemoryRedis) -> None:
+        self._redis = redis
+        self._commands: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+
+    async def __aenter__(self) -> "MemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._commands.clear()
+
+    def set(self, *args: Any, **kwargs: Any) -> "MemoryPipeline":
+        self._commands.append(("set", args, kwargs))
+        return self
+
+    def incr(self, *args: Any, **kwargs: Any) -> "MemoryPipeline":
+        self._commands.append(("incr", args, kwargs))
+        return self
+
+    async def execute(self) -> list[Any]:
+        commands, self._commands = self._commands, []
+        return [
+            await getattr(self._redis, name)(*args, **kwargs)
+            for name, args, kwargs in commands
+        ]
+
+
+def upstream(request: httpx.Request) -> httpx.Response:
+    """Answers the Hunter.io and Google calls made during signup and sign-in."""
+    if request.url.host == "api.hunter.io":
+        return httpx.Response(
+            200, json={"data": {"result": "deliverable", "mx_records": True}}
+        )
+    if request.url.path == "/o/oauth2/token":
+        return httpx.Response(200, json={"access_token": request.url.params["code"]})
+    if request.url.path == "/oauth2/v1/userinfo":
+        code = request.headers["Authorization"].removeprefix("Bearer ")
+        return httpx.Response(
+            200, json={"id": code, "email": f"{code}@bench.example.com"}
+        )
+
+    return httpx.Response(404)
+
+
+def install(application: FastAPI) -> MemoryRedis:
+    """Points the application at in-memory Redis, cache and upstreams."""
+    redis, original = MemoryRedis(), app.cache.redis
+    # Modules bind the client at import time, e.g. `from app.cache import redis`.
+    for module in list(sys.modules.values()):
+        if module.__name__.startswith("app.") and (
+            getattr(module, "redis", None) is original
+        ):
+            module.redis = redis  # type: ignore[attr-defined]
+
+    FastAPICache.init(InMemoryBackend(), prefix=CACHE_PREFIX)
+    application.state.http_client = create_http_client(httpx.MockTransport(upstream))
+
+    return redis
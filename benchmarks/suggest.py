@@ -0,0 +1,114 @@
+"""
+Measures the latency of product and category name suggestions.
+
+Prefixes of one to four letters taken from the seeding vocabulary are
+sent through the `suggest` service functions. The run fails when the
+95th percentile of either one exceeds `--budget-ms`.
+
+Usage:
+    python -m benchmarks.suggest --seed 1000000 --categories 50000
+    python -m benchmarks.suggest --queries 1000 --budget-ms 5
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from app.category import service as category_service
+from app.database.core import async_engine, async_session
+from app.product import service as product_service
+from app.tools.seed import WORDS, seed_catalog
+
+from .search import CATEGORIES
+
+SERVICES = {
+    "products": product_service.suggest,
+    "categories": category_service.suggest,
+}
+
+
+async def measure(name: str, queries: int, limit: int) -> list[float]:
+    """Returns the duration of each suggestion lookup, in milliseconds."""
+    rng = random.Random(0)
+    timings: list[float] = []
+
+    async with async_session() as db_session:
+        for attempt in range(queries + 10):
+            word = rng.choice(WORDS)
+            prefix = word[: rng.randint(1, min(4, len(word)))]
+            start = time.perf_counter()
+            await SERVICES[name](db_session=db_session, prefix=prefix, limit=limit)
+            # The first lookups warm up the connection and the caches.
+            if attempt >= 10:
+                timings.append((time.perf_counter() - start) * 1000)
+
+    return timings
+
+
+async def run(
+    products: int | None,
+    categories: int | None,
+    queries: int,
+    limit: int,
+    budget: float,
+) -> int:
+    if products or categories:
+        async with async_engine.connect() as connection:
+            await seed_catalog(
+                connection, categories=categories or CATEGORIES, products=products or 0
+            )
+
+    failed = False
+    for name in SERVICES:
+        timings = await measure(name, queries, limit)
+        p95 = statistics.quantiles(timings, n=100)[94]
+        print(
+            f"{name}: p50 {statistics.median(timings):.2f} ms, "
+            f"p95 {p95:.2f} ms, max {max(timings):.2f} ms"
+        )
+        if p95 > budget:
+            print(f"FAIL {name} p95 above the {budget} ms budget", file=sys.stderr)
+            failed = True
+
+    await async_engine.dispose()
+
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--seed",
+        type=int,
+        metavar="PRODUCTS",
+        help="insert synthetic rows until the catalog holds this many products",
+    )
+    parser.add_argument(
+        "--categories",
+        type=int,
+        help="insert synthetic categories until there are this many",
+    )
+    parser.add_argument("--queries", type=int, default=500, help="default: 500")
+    parser.add_argument(
+        "--limit", type=int, default=10, help="suggestions per lookup (default: 10)"
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=5.0,
+        help="fail when the p95 latency exceeds this (default: 5)",
+    )
+    args = parser.parse_args()
+
+    sys.exit(
+        asyncio.run(
+            run(args.seed, args.categories, args.queries, args.limit, args.budget_ms)
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
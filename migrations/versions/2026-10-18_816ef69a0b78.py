@@ -0,0 +1,65 @@
+"""Product filter indexes
+
+Revision ID: 816ef69a0b78
+Revises: e145ffbaa50a
+Create Date: 2026-10-18 10:12:41.503127
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "816ef69a0b78"
+down_revision: Union[str, None] = "e145ffbaa50a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_products_category_id_id",
+            "products",
+            ["category_id", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_products_category_id_price_id",
+            "products",
+            ["category_id", "price", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_products_price_id",
+            "products",
+            ["price", "id"],
+            unique=False,
+            postgresql_include=["category_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_products_price_id",
+            table_name="products",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_products_category_id_price_id",
+            table_name="products",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_products_category_id_id",
+            table_name="products",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,52 @@
+"""Name prefix indexes
+
+Revision ID: a81f0c6d2b93
+Revises: 3c9d5a1f7e42
+Create Date: 2026-10-18 15:21:47.662051
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a81f0c6d2b93"
+down_revision: Union[str, None] = "3c9d5a1f7e42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_products_name_prefix",
+            "products",
+            [sa.text('(lower(name) COLLATE "C")')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_categories_name_prefix",
+            "categories",
+            [sa.text('(lower(name) COLLATE "C")')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_categories_name_prefix",
+            table_name="categories",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_products_name_prefix",
+            table_name="products",
+            postgresql_concurrently=True,
+        )